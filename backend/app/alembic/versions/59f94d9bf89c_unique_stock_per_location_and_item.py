@@ -0,0 +1,51 @@
+"""unique stock per location and item
+
+Revision ID: 59f94d9bf89c
+Revises: 9b549b2d3828
+Create Date: 2026-10-18 09:12:41.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '59f94d9bf89c'
+down_revision = '9b549b2d3828'
+branch_labels = None
+depends_on = None
+
+
+def _merge_duplicates(table, location_column):
+    # Fold duplicated (location, item) rows into the oldest one so the
+    # unique constraint can be created on existing data
+    op.execute(f"""
+        WITH totals AS (
+            SELECT min(id) AS keep_id, sum(quantity) AS quantity
+            FROM {table}
+            GROUP BY {location_column}, item_id
+            HAVING count(*) > 1
+        )
+        UPDATE {table} SET quantity = totals.quantity
+        FROM totals WHERE {table}.id = totals.keep_id
+    """)
+    op.execute(f"""
+        DELETE FROM {table} AS duplicate
+        USING {table} AS kept
+        WHERE duplicate.{location_column} = kept.{location_column}
+          AND duplicate.item_id = kept.item_id
+          AND duplicate.id > kept.id
+    """)
+
+
+def upgrade():
+    _merge_duplicates('warehouseitemsbyid', 'warehouse_id')
+    op.create_unique_constraint('uq_warehouseitemsbyid_warehouse_id_item_id', 'warehouseitemsbyid', ['warehouse_id', 'item_id'])
+    _merge_duplicates('storeitemsbyid', 'store_id')
+    op.create_unique_constraint('uq_storeitemsbyid_store_id_item_id', 'storeitemsbyid', ['store_id', 'item_id'])
+
+
+def downgrade():
+    op.drop_constraint('uq_storeitemsbyid_store_id_item_id', 'storeitemsbyid', type_='unique')
+    op.drop_constraint('uq_warehouseitemsbyid_warehouse_id_item_id', 'warehouseitemsbyid', type_='unique')
@@ -0,0 +1,51 @@
+"""add table versions
+
+Revision ID: a41f6c2e8d93
+Revises: d7a3c5e91b04
+Create Date: 2026-10-18 14:21:40.512309
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c2e8d93'
+down_revision = 'd7a3c5e91b04'
+branch_labels = None
+depends_on = None
+
+# Tables whose list endpoints answer conditional GETs
+VERSIONED_TABLES = ['item', 'warehouse', 'store']
+
+
+def upgrade():
+    op.create_table('tableversion',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute('''
+        CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE tableversion SET version = version + 1 WHERE name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    for table in VERSIONED_TABLES:
+        op.execute(f"INSERT INTO tableversion (name, version) VALUES ('{table}', 0)")
+        # Once per statement, so bulk writes bump the version only once
+        op.execute(f'''
+            CREATE TRIGGER {table}_bump_table_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        ''')
+
+
+def downgrade():
+    for table in reversed(VERSIONED_TABLES):
+        op.execute(f'DROP TRIGGER {table}_bump_table_version ON {table}')
+    op.execute('DROP FUNCTION bump_table_version()')
+    op.drop_table('tableversion')
@@ -0,0 +1,39 @@
+"""add stock sort indexes
+
+Revision ID: a4c7e9f2b356
+Revises: f3a8d2c6e714
+Create Date: 2026-10-18 23:02:41.675209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e9f2b356'
+down_revision = 'f3a8d2c6e714'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns). Each serves one sort order of the stock of a
+# single location, with id breaking ties for keyset pagination.
+INDEXES = [
+    ('ix_warehouseitemsbyid_warehouse_id_quantity_id', 'warehouseitemsbyid', ['warehouse_id', 'quantity', 'id']),
+    ('ix_warehouseitemsbyid_warehouse_id_retail_price_id', 'warehouseitemsbyid', ['warehouse_id', 'retail_price', 'id']),
+    ('ix_storeitemsbyid_store_id_quantity_id', 'storeitemsbyid', ['store_id', 'quantity', 'id']),
+    ('ix_storeitemsbyid_store_id_retail_price_id', 'storeitemsbyid', ['store_id', 'retail_price', 'id']),
+]
+
+
+def upgrade():
+    # Build concurrently so existing tables stay writable meanwhile
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
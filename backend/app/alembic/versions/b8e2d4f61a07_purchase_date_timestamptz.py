@@ -0,0 +1,103 @@
+"""purchase date timestamptz
+
+Revision ID: b8e2d4f61a07
+Revises: a41f6c2e8d93
+Create Date: 2026-10-18 16:05:12.338904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2d4f61a07'
+down_revision = 'a41f6c2e8d93'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+INDEXES = [
+    ('ix_purchase_store_id_date', ['store_id', 'date']),
+    ('ix_purchase_date', ['date']),
+]
+
+
+def _backfill(connection):
+    # Short transactions over id ranges, only the rows of the current batch
+    # are locked at any time
+    low, high = connection.execute(sa.text('SELECT min(id), max(id) FROM purchase')).one()
+    if low is None:
+        return
+    for start in range(low - 1, high, BATCH_SIZE):
+        connection.execute(sa.text('''
+            UPDATE purchase SET date_ts = purchase_date_or_null(date)
+            WHERE id > :start AND id <= :stop AND date_ts IS NULL
+        '''), {'start': start, 'stop': start + BATCH_SIZE})
+
+
+def upgrade():
+    # Dates were stored without a zone, read them as UTC like the app does
+    with op.get_context().autocommit_block():
+        op.execute("SET TimeZone = 'UTC'")
+        op.execute('ALTER TABLE purchase ADD COLUMN IF NOT EXISTS date_ts timestamptz')
+        op.execute('''
+            CREATE OR REPLACE FUNCTION purchase_date_or_null(value text) RETURNS timestamptz AS $$
+            BEGIN
+                RETURN value::timestamptz;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql STABLE
+        ''')
+        # Rows written from now on carry their date_ts, so the backfill is
+        # the only pass over the table; invalid new dates are refused
+        op.execute('''
+            CREATE OR REPLACE FUNCTION purchase_set_date_ts() RETURNS trigger AS $$
+            BEGIN
+                NEW.date_ts := NEW.date::timestamptz;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute('DROP TRIGGER IF EXISTS purchase_set_date_ts ON purchase')
+        op.execute('''
+            CREATE TRIGGER purchase_set_date_ts BEFORE INSERT OR UPDATE OF date ON purchase
+            FOR EACH ROW EXECUTE FUNCTION purchase_set_date_ts()
+        ''')
+        _backfill(op.get_bind())
+        # Checked before locking, only rows with an invalid date are left
+        invalid = op.get_bind().execute(
+            sa.text('SELECT count(*) FROM purchase WHERE date_ts IS NULL')
+        ).scalar()
+        if invalid:
+            raise RuntimeError(f'{invalid} purchases have a date that is not a timestamp, fix them and retry')
+
+    # Swap the columns in one short exclusive lock, without reading the
+    # table; a failed run can simply be started again
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute('LOCK TABLE purchase IN ACCESS EXCLUSIVE MODE')
+    op.execute('DROP TRIGGER purchase_set_date_ts ON purchase')
+    op.execute('ALTER TABLE purchase ADD CONSTRAINT purchase_date_not_null CHECK (date_ts IS NOT NULL) NOT VALID')
+    op.execute('ALTER TABLE purchase DROP COLUMN date')
+    op.execute('ALTER TABLE purchase RENAME COLUMN date_ts TO date')
+
+    with op.get_context().autocommit_block():
+        # Validating does not block writes, SET NOT NULL then relies on the
+        # valid constraint instead of scanning the table under lock
+        op.execute('ALTER TABLE purchase VALIDATE CONSTRAINT purchase_date_not_null')
+        op.execute('ALTER TABLE purchase ALTER COLUMN date SET NOT NULL')
+        op.execute('ALTER TABLE purchase DROP CONSTRAINT purchase_date_not_null')
+        op.execute('DROP FUNCTION purchase_set_date_ts()')
+        op.execute('DROP FUNCTION purchase_date_or_null(text)')
+        for name, columns in INDEXES:
+            op.create_index(name, 'purchase', columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    op.alter_column('purchase', 'date',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sqlmodel.sql.sqltypes.AutoString(),
+               postgresql_using="to_char(date AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS')",
+               existing_nullable=False)
@@ -0,0 +1,97 @@
+"""partition purchase by month
+
+Revision ID: c5a9e3b72d18
+Revises: b8e2d4f61a07
+Create Date: 2026-10-18 17:42:03.117540
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a9e3b72d18'
+down_revision = 'b8e2d4f61a07'
+branch_labels = None
+depends_on = None
+
+# Monthly partitions created ahead of the legacy one, `python -m app.partitions`
+# keeps creating them afterwards
+MONTHS_AHEAD = 3
+
+# Indexes of the existing table, kept and attached to the partitioned one
+INDEXES = [
+    ('ix_purchase_store_id_date', 'purchase_legacy_store_id_date_idx', ['store_id', 'date']),
+    ('ix_purchase_item_id', 'purchase_legacy_item_id_idx', ['item_id']),
+    ('ix_purchase_date', 'purchase_legacy_date_idx', ['date']),
+]
+
+
+def _month(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def upgrade():
+    now = datetime.now(timezone.utc)
+    # The existing table becomes the partition of everything before next month
+    legacy_upper = _month(now.year, now.month + 1)
+
+    with op.get_context().autocommit_block():
+        # A partitioned table's primary key has to include the partition key
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS purchase_id_date_key ON purchase (id, date)')
+        # Proves the partition bound up front, so attaching does not scan
+        op.execute('ALTER TABLE purchase DROP CONSTRAINT IF EXISTS purchase_legacy_bound')
+        op.execute(f"ALTER TABLE purchase ADD CONSTRAINT purchase_legacy_bound CHECK (date < '{legacy_upper.isoformat()}') NOT VALID")
+        op.execute('ALTER TABLE purchase VALIDATE CONSTRAINT purchase_legacy_bound')
+
+    # Only catalog changes from here on, the exclusive lock is brief
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute('ALTER TABLE purchase RENAME TO purchase_legacy')
+    # The key becomes (id, date), reusing the index built above
+    op.execute('ALTER TABLE purchase_legacy DROP CONSTRAINT purchase_pkey')
+    op.execute('ALTER TABLE purchase_legacy ADD CONSTRAINT purchase_legacy_pkey PRIMARY KEY USING INDEX purchase_id_date_key')
+    for name, legacy_name, _ in INDEXES:
+        op.execute(f'ALTER INDEX {name} RENAME TO {legacy_name}')
+
+    op.execute('CREATE TABLE purchase (LIKE purchase_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (date)')
+    # Dropping the legacy partition under retention must not drop the ids
+    op.execute('ALTER SEQUENCE purchase_id_seq OWNED BY purchase.id')
+    op.execute('ALTER TABLE purchase ADD CONSTRAINT purchase_pkey PRIMARY KEY (id, date)')
+    op.create_foreign_key('purchase_store_id_fkey', 'purchase', 'store', ['store_id'], ['id'])
+    op.create_foreign_key('purchase_item_id_fkey', 'purchase', 'item', ['item_id'], ['id'])
+    for name, _, columns in INDEXES:
+        op.create_index(name, 'purchase', columns)
+
+    op.execute(f"ALTER TABLE purchase ATTACH PARTITION purchase_legacy FOR VALUES FROM (MINVALUE) TO ('{legacy_upper.isoformat()}')")
+    for offset in range(MONTHS_AHEAD):
+        lower = _month(legacy_upper.year, legacy_upper.month + offset)
+        upper = _month(lower.year, lower.month + 1)
+        op.execute(
+            f'CREATE TABLE purchase_p{lower:%Y_%m} PARTITION OF purchase '
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+    # Catches dates no partition covers yet, e.g. imported history
+    op.execute('CREATE TABLE purchase_default PARTITION OF purchase DEFAULT')
+
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE purchase_legacy DROP CONSTRAINT purchase_legacy_bound')
+
+
+def downgrade():
+    # Archived partitions (python -m app.partitions) are not brought back
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute('LOCK TABLE purchase IN ACCESS EXCLUSIVE MODE')
+    op.execute('ALTER TABLE purchase DETACH PARTITION purchase_legacy')
+    op.execute('INSERT INTO purchase_legacy SELECT * FROM purchase')
+    op.execute('ALTER SEQUENCE purchase_id_seq OWNED BY purchase_legacy.id')
+    op.execute('DROP TABLE purchase')
+
+    op.execute('ALTER TABLE purchase_legacy RENAME TO purchase')
+    op.execute('ALTER TABLE purchase DROP CONSTRAINT purchase_legacy_pkey')
+    op.execute('ALTER TABLE purchase ADD CONSTRAINT purchase_pkey PRIMARY KEY (id)')
+    for name, legacy_name, _ in INDEXES:
+        op.execute(f'ALTER INDEX {legacy_name} RENAME TO {name}')
@@ -0,0 +1,99 @@
+"""add sales daily rollup
+
+Revision ID: d2f7a8c4b519
+Revises: c5a9e3b72d18
+Create Date: 2026-10-18 19:10:27.804216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7a8c4b519'
+down_revision = 'c5a9e3b72d18'
+branch_labels = None
+depends_on = None
+
+# Adds (sign = 1) or removes (sign = -1) the purchases of a transition table
+# from the rollup, in key order so concurrent writers lock rows alike
+APPLY = '''
+    INSERT INTO salesdaily AS s (store_id, item_id, day, units, revenue, cost)
+    SELECT store_id, item_id, (date AT TIME ZONE 'UTC')::date,
+           {sign} * sum(quantity),
+           {sign} * sum(quantity * retail_price),
+           {sign} * sum(quantity * warehouse_price)
+    FROM {rows}
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (store_id, item_id, day) DO UPDATE SET
+        units = s.units + excluded.units,
+        revenue = s.revenue + excluded.revenue,
+        cost = s.cost + excluded.cost;
+'''
+
+
+def upgrade():
+    # No foreign keys, rows emptied by deleted purchases must not keep their
+    # store or item from being deleted
+    op.create_table('salesdaily',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('store_id', 'item_id', 'day')
+    )
+    op.create_index('ix_salesdaily_day', 'salesdaily', ['day'])
+
+    op.execute(f'''
+        CREATE FUNCTION salesdaily_add() RETURNS trigger AS $$
+        BEGIN
+            {APPLY.format(sign=1, rows='new_purchases')}
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    op.execute(f'''
+        CREATE FUNCTION salesdaily_remove() RETURNS trigger AS $$
+        BEGIN
+            {APPLY.format(sign=-1, rows='old_purchases')}
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    # Once per statement over all its rows, a batch of purchases costs one
+    # upsert per (store, item, day) it touches
+    op.execute('''
+        CREATE TRIGGER purchase_salesdaily_insert AFTER INSERT ON purchase
+        REFERENCING NEW TABLE AS new_purchases
+        FOR EACH STATEMENT EXECUTE FUNCTION salesdaily_add()
+    ''')
+    op.execute('''
+        CREATE TRIGGER purchase_salesdaily_delete AFTER DELETE ON purchase
+        REFERENCING OLD TABLE AS old_purchases
+        FOR EACH STATEMENT EXECUTE FUNCTION salesdaily_remove()
+    ''')
+    op.execute('''
+        CREATE TRIGGER purchase_salesdaily_update_old AFTER UPDATE ON purchase
+        REFERENCING OLD TABLE AS old_purchases
+        FOR EACH STATEMENT EXECUTE FUNCTION salesdaily_remove()
+    ''')
+    op.execute('''
+        CREATE TRIGGER purchase_salesdaily_update_new AFTER UPDATE ON purchase
+        REFERENCING NEW TABLE AS new_purchases
+        FOR EACH STATEMENT EXECUTE FUNCTION salesdaily_add()
+    ''')
+    # Existing history, scanned once
+    op.execute(APPLY.format(sign=1, rows='purchase'))
+
+
+def downgrade():
+    for trigger in ['insert', 'delete', 'update_old', 'update_new']:
+        op.execute(f'DROP TRIGGER purchase_salesdaily_{trigger} ON purchase')
+    op.execute('DROP FUNCTION salesdaily_add()')
+    op.execute('DROP FUNCTION salesdaily_remove()')
+    op.drop_index('ix_salesdaily_day', table_name='salesdaily')
+    op.drop_table('salesdaily')
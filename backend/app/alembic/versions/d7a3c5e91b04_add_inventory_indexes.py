@@ -0,0 +1,43 @@
+"""add inventory indexes
+
+Revision ID: d7a3c5e91b04
+Revises: 59f94d9bf89c
+Create Date: 2026-10-18 10:02:17.884216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3c5e91b04'
+down_revision = '59f94d9bf89c'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns). Lookups of a single location are served by the
+# (location, id) indexes, which also match the keyset pagination order;
+# (location, item) lookups are already covered by the unique constraints.
+INDEXES = [
+    ('ix_warehouseitemsbyid_warehouse_id_id', 'warehouseitemsbyid', ['warehouse_id', 'id']),
+    ('ix_warehouseitemsbyid_item_id', 'warehouseitemsbyid', ['item_id']),
+    ('ix_storeitemsbyid_store_id_id', 'storeitemsbyid', ['store_id', 'id']),
+    ('ix_storeitemsbyid_item_id', 'storeitemsbyid', ['item_id']),
+    ('ix_purchase_store_id_date', 'purchase', ['store_id', 'date']),
+    ('ix_purchase_item_id', 'purchase', ['item_id']),
+    ('ix_purchase_date', 'purchase', ['date']),
+]
+
+
+def upgrade():
+    # Build concurrently so existing tables stay writable meanwhile
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
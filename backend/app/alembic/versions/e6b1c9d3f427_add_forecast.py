@@ -0,0 +1,35 @@
+"""add forecast
+
+Revision ID: e6b1c9d3f427
+Revises: d2f7a8c4b519
+Create Date: 2026-10-18 20:31:52.406118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b1c9d3f427'
+down_revision = 'd2f7a8c4b519'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Replaced as a whole by every forecasting run, no foreign keys so
+    # that it never holds back deleting stores or items
+    op.create_table('forecast',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('daily_demand', sa.Float(), nullable=False),
+    sa.Column('demand_stddev', sa.Float(), nullable=False),
+    sa.Column('reorder_point', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('store_id', 'item_id')
+    )
+
+
+def downgrade():
+    op.drop_table('forecast')
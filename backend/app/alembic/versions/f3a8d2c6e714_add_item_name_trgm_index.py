@@ -0,0 +1,34 @@
+"""add item name trgm index
+
+Revision ID: f3a8d2c6e714
+Revises: e6b1c9d3f427
+Create Date: 2026-10-18 22:14:05.318472
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d2c6e714'
+down_revision = 'e6b1c9d3f427'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Build concurrently so the catalog stays writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_item_name_trgm', 'item', ['name'],
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    # pg_trgm is left installed, other objects may depend on it
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_item_name_trgm', table_name='item', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,90 @@
+import json
+from typing import Annotated, Any, TypeVar
+
+from fastapi import Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlmodel import SQLModel
+
+from app.models import BulkRowError
+
+ModelT = TypeVar("ModelT", bound=SQLModel)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def get_bulk_rows(request: Request) -> list[Any]:
+    """
+    Read a request body holding either a JSON array or NDJSON lines.
+
+    Rows are returned unvalidated so that each one can be checked on its own
+    and reported back by index instead of failing the whole request.
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        rows = []
+        for line_number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise HTTPException(
+                    status_code=400, detail=f"Invalid NDJSON on line {line_number}"
+                )
+        return rows
+
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    return rows
+
+
+BulkRowsDep = Annotated[list[Any], Depends(get_bulk_rows)]
+
+
+def row_error(index: int, error: ValidationError) -> BulkRowError:
+    """
+    Report the validation errors of row `index` on a single line.
+    """
+    detail = "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+    return BulkRowError(index=index, detail=detail)
+
+
+def validate_rows(
+    rows: list[Any], model: type[ModelT]
+) -> tuple[list[ModelT], list[BulkRowError]]:
+    """
+    Validate every row against `model`, splitting valid rows from errors.
+    """
+    valid: list[ModelT] = []
+    errors: list[BulkRowError] = []
+    for index, row in enumerate(rows):
+        try:
+            valid.append(model.model_validate(row))
+        except ValidationError as e:
+            errors.append(row_error(index, e))
+    return valid, errors
+
+
+def bulk_request_body(model: type[SQLModel]) -> dict[str, Any]:
+    """
+    OpenAPI request body for routes reading their rows with `BulkRowsDep`.
+    """
+    schema = {
+        "type": "array",
+        "items": {"$ref": f"#/components/schemas/{model.__name__}"},
+    }
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                NDJSON_MEDIA_TYPE: {"schema": schema["items"]},
+            },
+        }
+    }
@@ -0,0 +1,44 @@
+import hashlib
+from collections.abc import Awaitable, Callable
+
+from fastapi import HTTPException, Request, Response
+from sqlmodel import SQLModel
+
+from app.api.deps import AsyncSessionDep
+from app.crud import table_version
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def conditional_get(
+    model: type[SQLModel],
+) -> Callable[..., Awaitable[int]]:
+    """
+    Dependency answering GETs of a list of `model` with a 304 when the
+    client already holds the current page.
+
+    The ETag combines the table version with the query string, so it
+    changes with any write to the table and differs between pages, without
+    reading or serializing the rows. The version is returned, for
+    `count_rows` to cache counts per version and never pair an ETag with
+    the count of an older one.
+    """
+    name = str(model.__tablename__)
+
+    async def dependency(
+        request: Request, response: Response, session: AsyncSessionDep
+    ) -> int:
+        # Read before the rows, a write in between then only costs a refetch
+        version = await session.run_sync(table_version, name)
+        query = hashlib.blake2b(request.url.query.encode(), digest_size=8).hexdigest()
+        etag = f'"{name}-{version}-{query}"'
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return version
+
+    return dependency
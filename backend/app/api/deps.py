@@ -1,16 +1,26 @@
-from collections.abc import Generator
-from typing import Annotated
+import sys
+import threading
+from collections.abc import AsyncGenerator, Generator
+from typing import Annotated, Any, TypeVar
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlmodel import Session, SQLModel, col, select
 
-from app.core import security
+from app import crud
+from app.core import invalidation, security
+from app.core.cache import ShardedTTLCache, TTLCache
 from app.core.config import settings
-from app.core.db import engine
-from app.models import TokenPayload, User
+from app.core.db import AsyncSession, async_engine, engine
+from app.core.metrics import metrics
+from app.core.prefix_index import PrefixIndex, id_name_pairs
+from app.models import Item, TokenPayload, User
+
+M = TypeVar("M", bound=SQLModel)
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -22,10 +32,168 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # Objects stay loaded after commit, lazy refreshes are not possible
+    # once the response is being serialized outside of the session
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
+def _get_cached(
+    session: Session,
+    cache: TTLCache[int, dict[str, Any]] | ShardedTTLCache[int, dict[str, Any]],
+    model: type[M],
+    id: int,
+) -> M | None:
+    """
+    Get a row by primary key, from `cache` when possible.
+
+    A cached row is rebuilt and attached to `session` as if it had been
+    loaded, without a query. A row loaded while it was invalidated is not
+    cached, so it cannot outlive the invalidation.
+    """
+    state = cache.get(id)
+    if state is None:
+        generation = cache.generation(id)
+        obj = session.get(model, id)
+        if obj:
+            cache.set(id, obj.model_dump(), generation)
+        return obj
+    obj = session.identity_map.get(identity_key(model, id))
+    if obj is None:
+        obj = model(**state)
+        make_transient_to_detached(obj)
+        session.add(obj)
+    return obj
+
+
+# Column values of recently authenticated users, by id
+user_cache: TTLCache[int, dict[str, Any]] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+invalidation.register(
+    "user",
+    invalidate=lambda key: user_cache.pop(int(key)),
+    reset=user_cache.clear,
+)
+
+
+def get_user_cached(session: Session, user_id: int) -> User | None:
+    """
+    Get a user, from the cache when possible.
+
+    The user is attached to `session`, so routes can keep updating it as
+    usual.
+    """
+    return _get_cached(session, user_cache, User, user_id)
+
+
+def invalidate_user(session: Session, user_id: int | None) -> None:
+    """
+    Drop a user from the cache of every worker, once its change is committed.
+    """
+    invalidation.publish(session, "user", user_id)
+
+
+def _state_size(state: dict[str, Any]) -> int:
+    return sys.getsizeof(state) + sum(sys.getsizeof(v) for v in state.values())
+
+
+# Column values of catalog items, by id
+item_cache: ShardedTTLCache[int, dict[str, Any]] = ShardedTTLCache(
+    shards=settings.ITEM_CACHE_SHARDS,
+    maxsize=settings.ITEM_CACHE_MAX_ENTRIES,
+    ttl=settings.ITEM_CACHE_TTL_SECONDS,
+    maxbytes=settings.ITEM_CACHE_MAX_BYTES,
+    sizeof=_state_size,
+)
+invalidation.register(
+    "item",
+    invalidate=lambda key: item_cache.pop(int(key)),
+    reset=item_cache.clear,
+)
+metrics.register_gauge("item_cache_hits", lambda: item_cache.hits)
+metrics.register_gauge("item_cache_misses", lambda: item_cache.misses)
+metrics.register_gauge("item_cache_entries", lambda: len(item_cache))
+metrics.register_gauge("item_cache_bytes", lambda: item_cache.bytes)
+
+
+def get_item_cached(session: Session, item_id: int) -> Item | None:
+    """
+    Get a catalog item, from the cache when possible.
+
+    Meant for reads only: a cached item may be up to ITEM_CACHE_TTL_SECONDS
+    old when an invalidation was missed, so writes load the row instead.
+    """
+    return _get_cached(session, item_cache, Item, item_id)
+
+
+def invalidate_item(session: Session, item_id: int | None) -> None:
+    """
+    Drop an item from the caches of every worker, once its change is
+    committed.
+    """
+    invalidation.publish(session, "item", item_id)
+
+
+def invalidate_items(session: Session, item_ids: list[int]) -> None:
+    """
+    `invalidate_item` for several items at once.
+    """
+    invalidation.publish_many(session, "item", item_ids)
+
+
+# Names of all catalog items, for autocomplete
+item_names = PrefixIndex()
+_item_names_load_lock = threading.Lock()
+invalidation.register(
+    "item",
+    invalidate=lambda key: item_names.invalidate(int(key)),
+    reset=item_names.reset,
+)
+metrics.register_gauge("item_names_entries", lambda: len(item_names))
+
+
+def _item_names_stale(version: int | None) -> bool:
+    return not item_names.loaded or (
+        version is not None and version > item_names.version
+    )
+
+
+def autocomplete_items(
+    session: Session, prefix: str, limit: int
+) -> list[tuple[int, str]]:
+    """
+    Ids and names of the items whose name starts with `prefix`.
+
+    Served from `item_names`, loaded in full on first use, after which
+    only the items invalidated since the previous lookup are read again.
+    Without CACHE_INVALIDATION_NOTIFY the writes of other workers are not
+    invalidated here, so the index is loaded again whenever the version of
+    the item table moved. Runs in the threadpool, as the locks are held
+    across queries.
+    """
+    version = None
+    if not settings.CACHE_INVALIDATION_NOTIFY:
+        version = crud.table_version(session, "item")
+    if _item_names_stale(version):
+        with _item_names_load_lock:
+            if _item_names_stale(version):
+                # Read before the rows, which are then at least as recent
+                rows = id_name_pairs(session.exec(select(Item.id, Item.name)).all())
+                item_names.load(rows, version or 0)
+    pending = item_names.take_pending()
+    if pending:
+        statement = select(Item.id, Item.name).where(col(Item.id).in_(pending))
+        item_names.update(pending, id_name_pairs(session.exec(statement).all()))
+    return item_names.search(prefix, limit)
+
+
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
     try:
         payload = jwt.decode(
@@ -37,7 +205,7 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    user = get_user_cached(session, token_data.sub) if token_data.sub else None
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
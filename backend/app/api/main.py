@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, users, utils, warehouses, stores, warehouseitems, storeitems, purchases
+from app.api.routes import items, login, users, utils, warehouses, stores, warehouseitems, storeitems, purchases, transfers, snapshots, imports, analytics
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
@@ -12,3 +12,7 @@ api_router.include_router(warehouseitems.router, prefix="/warehouseitems", tags=
 api_router.include_router(storeitems.router, prefix="/storeitems", tags=["storeitems"])
 api_router.include_router(stores.router, prefix="/stores", tags=["stores"])
 api_router.include_router(purchases.router, prefix="/purchases", tags=["purchases"])
+api_router.include_router(transfers.router, prefix="/transfers", tags=["transfers"])
+api_router.include_router(snapshots.router, prefix="/snapshots", tags=["snapshots"])
+api_router.include_router(imports.router, prefix="/imports", tags=["imports"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
@@ -0,0 +1,253 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from functools import cache
+from typing import Annotated, Any, Literal, TypeVar
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, literal, text, tuple_
+from sqlmodel import Session, SQLModel, UniqueConstraint, col, func, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+ModelT = TypeVar("ModelT", bound=SQLModel)
+
+CURSOR_PREFIX = "id:"
+
+CountMode = Literal["exact", "estimated", "none"]
+CountModeQuery = Annotated[CountMode, Query(alias="count")]
+
+SortQuery = Annotated[
+    str,
+    Query(
+        description="Column to sort by, prefixed with `-` for descending order. "
+        "Only columns with a supporting index are accepted."
+    ),
+]
+
+count_cache: TTLCache[tuple[str, tuple[Any, ...], int | None], int] = TTLCache(
+    maxsize=settings.COUNT_CACHE_MAX_ENTRIES, ttl=settings.COUNT_CACHE_TTL_SECONDS
+)
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Build the opaque `after` token pointing just past the row with `last_id`.
+    """
+    raw = f"{CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Return the row id encoded in an `after` token.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(CURSOR_PREFIX):
+            raise ValueError(raw)
+        return int(raw[len(CURSOR_PREFIX) :])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_sort_cursor(sort: str, value: Any, last_id: int) -> str:
+    """
+    `encode_cursor` for pages sorted by `sort` (see `resolve_sort`), also
+    holding the sort value of the last row.
+    """
+    raw = f"{sort}:{json.dumps([value, last_id])}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sort_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    """
+    Return the sort value and row id encoded in an `after` token, which
+    must have been issued for the same `sort`.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(f"{sort}:"):
+            raise ValueError(raw)
+        value, last_id = json.loads(raw[len(sort) + 1 :])
+        if not isinstance(last_id, int):
+            raise ValueError(raw)
+        return value, last_id
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@cache
+def _indexed_prefixes(model: type[SQLModel]) -> frozenset[tuple[str, ...]]:
+    # Every leading column list of the primary key, indexes and unique
+    # constraints of the table: the orders a btree can return rows in
+    table: Any = model.__table__  # type: ignore[attr-defined]
+    keys = [table.primary_key.columns, *(index.columns for index in table.indexes)]
+    keys += [
+        constraint.columns
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    ]
+    return frozenset(
+        tuple(column.name for column in list(columns)[:length])
+        for columns in keys
+        for length in range(1, len(columns) + 1)
+    )
+
+
+def resolve_sort(
+    model: type[SQLModel], sort: str, equal_columns: Sequence[str] = ()
+) -> tuple[str, bool]:
+    """
+    Check `sort`, a column name optionally prefixed with `-` for descending
+    order, and return the column name and whether it is descending.
+
+    The statement is expected to filter `equal_columns` on single values.
+    Sorting is only allowed on a column following them in an index, so that
+    the database reads rows in order instead of sorting the whole match.
+    """
+    name = sort.removeprefix("-")
+    if name not in model.model_fields:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {name}")
+    if (*equal_columns, name) not in _indexed_prefixes(model):
+        raise HTTPException(
+            status_code=400, detail=f"Cannot sort by {name}, it is not indexed"
+        )
+    return name, sort.startswith("-")
+
+
+def paginate(
+    session: Session,
+    statement: SelectOfScalar[ModelT],
+    model: type[ModelT],
+    *,
+    skip: int,
+    limit: int,
+    after: str | None,
+    sort: str = "id",
+) -> tuple[Sequence[ModelT], str | None]:
+    """
+    Fetch one page of `statement` ordered by `sort` then primary key, `sort`
+    having been checked with `resolve_sort`.
+
+    With `after` the page is located with an index range scan on the sort
+    columns (keyset pagination), so deep pages cost the same as the first
+    one. Without it the classic `skip`/`limit` OFFSET behaviour is kept.
+    One extra row is fetched to know whether a `next_cursor` is needed.
+    """
+    id_column: Any = col(model.id)  # type: ignore[attr-defined]
+    name = sort.removeprefix("-")
+    descending = sort.startswith("-")
+    if name == "id":
+        keys = [id_column]
+    else:
+        keys = [col(getattr(model, name)), id_column]
+    statement = statement.order_by(*(key.desc() if descending else key for key in keys))
+    if after is not None:
+        if name == "id":
+            position, bound = id_column, decode_cursor(after)
+            statement = statement.where(
+                position < bound if descending else position > bound
+            )
+        else:
+            row_keys = tuple_(*keys)
+            row_bound = tuple_(*map(literal, decode_sort_cursor(after, sort)))
+            statement = statement.where(
+                row_keys < row_bound if descending else row_keys > row_bound
+            )
+    else:
+        statement = statement.offset(skip)
+    rows = session.exec(statement.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            last: Any = rows[-1]
+            if name == "id":
+                next_cursor = encode_cursor(last.id)
+            else:
+                next_cursor = encode_sort_cursor(sort, getattr(last, name), last.id)
+    return rows, next_cursor
+
+
+def _exact_count(session: Session, statement: Select[Any], version: int | None) -> int:
+    count_statement = select(func.count()).select_from(statement.subquery())
+    compiled = count_statement.compile()
+    # IN lists are bound as Python lists, which cannot be hashed
+    params = (
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in compiled.params.items()
+    )
+    key = (str(compiled), tuple(sorted(params)), version)
+    count = count_cache.get(key)
+    if count is None:
+        count = session.exec(count_statement).one()
+        count_cache.set(key, count)
+    return count
+
+
+def _selects_whole_table(statement: Select[Any], model: type[SQLModel]) -> bool:
+    # Only then is the number of rows the one of the table: no filter, no
+    # join, and no grouping or aggregate folding rows together
+    return (
+        statement.whereclause is None
+        and not statement._group_by_clauses
+        and statement.get_final_froms() == [model.__table__]  # type: ignore[attr-defined]
+        and [column["expr"] for column in statement.column_descriptions] == [model]
+    )
+
+
+def _estimated_count(
+    session: Session, statement: Select[Any], model: type[SQLModel]
+) -> int:
+    if _selects_whole_table(statement, model):
+        # Planner statistics for the whole table, maintained by (auto)analyze.
+        # A partitioned table has none of its own, its partitions are summed
+        # instead, skipping unanalyzed ones
+        reltuples = session.execute(
+            text(
+                "SELECT sum(reltuples) FILTER (WHERE reltuples >= 0) "
+                "FROM pg_class WHERE relkind <> 'p' AND oid IN ("
+                "SELECT to_regclass(:name) UNION ALL "
+                "SELECT relid FROM pg_partition_tree(to_regclass(:name)))"
+            ),
+            {"name": model.__tablename__},
+        ).scalar()
+    else:
+        compiled = statement.compile(
+            dialect=session.get_bind().dialect,
+            compile_kwargs={"literal_binds": True},
+        )
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        reltuples = plan[0]["Plan"]["Plan Rows"] if plan else None
+    if reltuples is None or reltuples < 0:
+        # Never analyzed yet, there is nothing to estimate from
+        return _exact_count(session, statement, None)
+    return int(reltuples)
+
+
+def count_rows(
+    session: Session,
+    statement: Select[Any],
+    model: type[SQLModel],
+    mode: CountMode,
+    version: int | None = None,
+) -> int | None:
+    """
+    Count the rows matched by `statement` according to `mode`.
+
+    `exact` runs a real COUNT, cached per filter for a few seconds, and per
+    table `version` when given by `conditional_get`. `estimated` reads the
+    planner statistics and `none` skips counting.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimated":
+        return _estimated_count(session, statement, model)
+    return _exact_count(session, statement, version)
@@ -0,0 +1,187 @@
+from datetime import date
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import and_, col, func, select
+
+from app import forecasting, valuation
+from app.api.deps import AsyncSessionDep, SessionDep, get_current_active_superuser
+from app.api.pagination import CountModeQuery, count_rows
+from app.models import (
+    Forecast,
+    ForecastPublic,
+    ForecastRunPublic,
+    ForecastsPublic,
+    SalesDaily,
+    SalesPublic,
+    SalesRow,
+    StoreItemsById,
+    ValuationPublic,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+router = APIRouter()
+
+GROUP_COLUMNS = {
+    "store": col(SalesDaily.store_id),
+    "item": col(SalesDaily.item_id),
+    "day": col(SalesDaily.day),
+}
+
+
+def parse_group_by(group_by: str) -> list[str]:
+    """
+    Split a comma-separated `group_by` into known keys, keeping their order.
+    """
+    keys: list[str] = []
+    for key in (part.strip() for part in group_by.split(",")):
+        if not key or key in keys:
+            continue
+        if key not in GROUP_COLUMNS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot group by {key!r}, expected one of "
+                + ", ".join(GROUP_COLUMNS),
+            )
+        keys.append(key)
+    return keys
+
+
+@router.get("/sales", response_model=SalesPublic)
+async def read_sales(
+    session: AsyncSessionDep,
+    group_by: str = "store,item,day",
+    store_id: int | None = None,
+    item_id: int | None = None,
+    date_from: date | None = Query(default=None, alias="from"),
+    date_to: date | None = Query(default=None, alias="to"),
+    skip: int = 0,
+    limit: int = 1000,
+    count_mode: CountModeQuery = "estimated",
+) -> Any:
+    """
+    Units sold, revenue, cost and margin grouped by any of store, item and
+    day, optionally from (inclusive) / to (exclusive) a UTC day.
+
+    Served from the daily rollup kept up to date by triggers on purchase,
+    so the cost depends on the number of groups rather than purchases. The
+    number of groups is estimated by default, an exact count groups the
+    rollup again on every page.
+    """
+    columns = [GROUP_COLUMNS[key] for key in parse_group_by(group_by)]
+    statement = select(
+        func.coalesce(func.sum(SalesDaily.units), 0).label("units"),
+        func.coalesce(func.sum(SalesDaily.revenue), 0).label("revenue"),
+        func.coalesce(func.sum(SalesDaily.cost), 0).label("cost"),
+    ).add_columns(*columns)
+    if store_id is not None:
+        statement = statement.where(col(SalesDaily.store_id) == store_id)
+    if item_id is not None:
+        statement = statement.where(col(SalesDaily.item_id) == item_id)
+    if date_from is not None:
+        statement = statement.where(col(SalesDaily.day) >= date_from)
+    if date_to is not None:
+        statement = statement.where(col(SalesDaily.day) < date_to)
+    if columns:
+        statement = statement.group_by(*columns).order_by(*columns)
+
+    # Number of groups, over all pages
+    count = await session.run_sync(count_rows, statement, SalesDaily, count_mode)
+    result = await session.execute(statement.offset(skip).limit(limit))
+    data = [
+        SalesRow(**row, margin=row["revenue"] - row["cost"])
+        for row in result.mappings()
+    ]
+    return SalesPublic(data=data, count=count)
+
+
+@router.get("/valuation", response_model=ValuationPublic)
+async def read_valuation(
+    session: AsyncSessionDep,
+    location_type: valuation.LocationType | None = None,
+    location_id: int | None = None,
+) -> Any:
+    """
+    Units on hand and their value at warehouse and retail prices, per
+    warehouse and store, or for one location type or location only.
+
+    Each location is cached until its stock changes.
+    """
+    if location_id is not None and location_type is None:
+        raise HTTPException(
+            status_code=400, detail="location_id requires a location_type"
+        )
+    location_types: list[str] = (
+        [location_type] if location_type else list(valuation.LOCATIONS)
+    )
+    data = []
+    for name in location_types:
+        data.extend(await session.run_sync(valuation.valuate, name, location_id))
+    return ValuationPublic(data=data, count=len(data))
+
+
+@router.get("/forecasts", response_model=ForecastsPublic)
+async def read_forecasts(
+    session: AsyncSessionDep,
+    store_id: int | None = None,
+    item_id: int | None = None,
+    below_reorder_point: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = "exact",
+) -> Any:
+    """
+    Latest demand forecasts and reorder points, with the quantity on hand,
+    optionally only where it has fallen to the reorder point or below.
+    """
+    statement = select(Forecast, StoreItemsById.quantity).outerjoin(
+        StoreItemsById,
+        and_(
+            col(StoreItemsById.store_id) == Forecast.store_id,
+            col(StoreItemsById.item_id) == Forecast.item_id,
+        ),
+    )
+    if store_id is not None:
+        statement = statement.where(col(Forecast.store_id) == store_id)
+    if item_id is not None:
+        statement = statement.where(col(Forecast.item_id) == item_id)
+    if below_reorder_point:
+        statement = statement.where(
+            col(StoreItemsById.quantity) <= col(Forecast.reorder_point)
+        )
+    count = await session.run_sync(count_rows, statement, Forecast, count_mode)
+    statement = (
+        statement.order_by(col(Forecast.store_id), col(Forecast.item_id))
+        .offset(skip)
+        .limit(limit)
+    )
+
+    result = await session.execute(statement)
+    data = [
+        ForecastPublic(**forecast.model_dump(), on_hand=on_hand)
+        for forecast, on_hand in result
+    ]
+    return ForecastsPublic(data=data, count=count)
+
+
+@router.post(
+    "/forecasts/recompute",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=ForecastRunPublic,
+)
+def recompute_forecasts(
+    session: SessionDep, method: forecasting.ForecastMethod = "exponential_smoothing"
+) -> Any:
+    """
+    Forecast every item stocked by every store again, as
+    `python -m app.forecasting` does.
+    """
+    if np is None:
+        raise HTTPException(
+            status_code=501, detail="Forecasting is not available on this server"
+        )
+    return forecasting.recompute(session, method=method)
@@ -0,0 +1,34 @@
+import codecs
+import csv
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile
+
+from app import csv_import
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.models import CsvImportPublic
+
+router = APIRouter()
+
+
+@router.post(
+    "/{table}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=CsvImportPublic,
+)
+def import_csv(session: SessionDep, table: str, file: UploadFile) -> Any:
+    """
+    Import a CSV file into item, warehouseitemsbyid, storeitemsbyid or
+    purchase.
+
+    Invalid rows are skipped and reported by index in `errors`.
+    """
+    if table not in csv_import.IMPORT_MODELS:
+        raise HTTPException(status_code=404, detail="Table not found")
+    # Decoded and parsed line by line from the spooled upload
+    lines = codecs.iterdecode(file.file, "utf-8-sig")
+    try:
+        return csv_import.import_csv(session=session, table=table, lines=lines)
+    except (UnicodeDecodeError, csv.Error) as e:
+        session.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
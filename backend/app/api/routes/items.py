@@ -1,35 +1,98 @@
-from typing import Any
+import time
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import col, func, select
 
-from app.api.deps import SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.bulk import BulkRowsDep, bulk_request_body, validate_rows
+from app.api.conditional import conditional_get
+from app.api.deps import (
+    AsyncSessionDep,
+    SessionDep,
+    autocomplete_items,
+    get_item_cached,
+    invalidate_item,
+    invalidate_items,
+)
+from app.api.pagination import CountModeQuery, count_rows, paginate
+from app.core.config import settings
+from app.core.prefix_index import id_name_pairs
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsBulkPublic,
+    ItemsPublic,
+    ItemSuggestion,
+    ItemSuggestionsPublic,
+    ItemUpdate,
+    Message,
+)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=ItemsPublic)
-def read_items(
-    session: SessionDep, skip: int = 0, limit: int = 100
+@router.get(
+    "/",
+    response_model=ItemsPublic,
+)
+async def read_items(
+    session: AsyncSessionDep,
+    version: Annotated[int, Depends(conditional_get(Item))],
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
 ) -> Any:
     """
     Retrieve items.
     """
-    count_statement = select(func.count()).select_from(Item)
-    count = session.exec(count_statement).one()
-    statement = select(Item).offset(skip).limit(limit)
-    items = session.exec(statement).all()
+    statement = select(Item)
+    count = await session.run_sync(count_rows, statement, Item, count_mode, version)
+    items, next_cursor = await session.run_sync(
+        paginate, statement, Item, skip=skip, limit=limit, after=after
+    )
 
-    return ItemsPublic(data=items, count=count)
+    return ItemsPublic(data=items, count=count, next_cursor=next_cursor)
+
+
+@router.get("/search", response_model=ItemSuggestionsPublic)
+def search_items(
+    session: SessionDep,
+    q: str = Query(min_length=1, max_length=255),
+    mode: Literal["fuzzy", "prefix"] = "fuzzy",
+    limit: int = Query(10, ge=1, le=100),
+) -> Any:
+    """
+    Search items by name.
+
+    `fuzzy` matches names containing a word similar to `q`, best matches
+    first, through the trigram index. `prefix` matches names starting with
+    `q`, ignoring case, in name order, from an in-memory index meant for
+    autocomplete.
+    """
+    if mode == "prefix":
+        found = autocomplete_items(session, q, limit)
+    else:
+        statement = (
+            select(Item.id, Item.name)
+            .where(col(Item.name).op("%>")(q))
+            .order_by(func.word_similarity(q, Item.name).desc(), col(Item.id))
+            .limit(limit)
+        )
+        found = id_name_pairs(session.exec(statement).all())
+    data = [ItemSuggestion(id=id, name=name) for id, name in found]
+    return ItemSuggestionsPublic(data=data, count=len(data))
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, id: int) -> Any:
+async def read_item(session: AsyncSessionDep, id: int) -> Any:
     """
     Get item by ID.
     """
-    item = session.get(Item, id)
+    item = await session.run_sync(get_item_cached, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -37,47 +100,84 @@ def read_item(session: SessionDep, id: int) -> Any:
 
 
 @router.post("/", response_model=ItemPublic)
-def create_item(
-    *, session: SessionDep, item_in: ItemCreate
+async def create_item(
+    *, session: AsyncSessionDep, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
     """
     item = Item.model_validate(item_in)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
+    await session.run_sync(invalidate_item, item.id)
     return item
 
 
+@router.post(
+    "/bulk",
+    response_model=ItemsBulkPublic,
+    openapi_extra=bulk_request_body(ItemCreate),
+)
+async def create_items_bulk(*, session: AsyncSessionDep, rows: BulkRowsDep) -> Any:
+    """
+    Create items in bulk from a JSON array or an NDJSON stream.
+
+    Invalid rows are skipped and reported by index in `errors`.
+    """
+    started = time.perf_counter()
+    # Validating a large catalog is CPU bound, keep it off the event loop
+    items_in, errors = await run_in_threadpool(validate_rows, rows, ItemCreate)
+    items = await session.run_sync(
+        lambda sync_session: crud.create_items(
+            session=sync_session,
+            items_in=items_in,
+            chunk_size=settings.BULK_INSERT_CHUNK_SIZE,
+        )
+    )
+    # Inserted items always have an id, their model types it optional
+    item_ids = [item.id for item in items if item.id is not None]
+    await session.run_sync(invalidate_items, item_ids)
+    elapsed = time.perf_counter() - started
+    return ItemsBulkPublic(
+        data=items,
+        count=len(items),
+        errors=errors,
+        elapsed_seconds=elapsed,
+        rows_per_second=len(items) / elapsed if elapsed else 0.0,
+    )
+
+
 @router.put("/{id}", response_model=ItemPublic)
-def update_item(
-    *, session: SessionDep, id: int, item_in: ItemUpdate
+async def update_item(
+    *, session: AsyncSessionDep, id: int, item_in: ItemUpdate
 ) -> Any:
     """
     Update an item.
     """
-    item = session.get(Item, id)
+    item = await session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
    
     update_dict = item_in.model_dump(exclude_unset=True)
     item.sqlmodel_update(update_dict)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
+    await session.run_sync(invalidate_item, id)
     return item
 
 
 @router.delete("/{id}")
-def delete_item(session: SessionDep, id: int) -> Message:
+async def delete_item(session: AsyncSessionDep, id: int) -> Message:
     """
     Delete an item.
     """
-    item = session.get(Item, id)
+    item = await session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
    
-    session.delete(item)
-    session.commit()
+    await session.delete(item)
+    await session.commit()
+    await session.run_sync(invalidate_item, id)
     return Message(message="Item deleted successfully")
@@ -6,10 +6,15 @@ from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
-from app.core import security
+from app.api.deps import (
+    AsyncSessionDep,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+    invalidate_user,
+)
+from app.core import hashing, security
 from app.core.config import settings
-from app.core.security import get_password_hash
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
@@ -22,19 +27,33 @@ router = APIRouter()
 
 
 @router.post("/login/access-token")
-def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+async def login_access_token(
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.authenticate(
-        session=session, email=form_data.username, password=form_data.password
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(
+            session=sync_session, email=form_data.username
+        )
     )
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    verified, new_hash = await hashing.verify_password(
+        form_data.password, user.hashed_password
+    )
+    if not verified:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if new_hash:
+        # Stored with outdated bcrypt parameters, upgrade it now that the
+        # plain password is known
+        user.hashed_password = new_hash
+        await session.commit()
+        await session.run_sync(invalidate_user, user.id)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return Token(
         access_token=security.create_access_token(
@@ -76,14 +95,16 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: AsyncSessionDep, body: NewPassword) -> Message:
     """
     Reset password
     """
     email = verify_password_reset_token(token=body.token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(session=sync_session, email=email)
+    )
     if not user:
         raise HTTPException(
             status_code=404,
@@ -91,10 +112,9 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
-    user.hashed_password = hashed_password
-    session.add(user)
-    session.commit()
+    user.hashed_password = await hashing.hash_password(body.new_password)
+    await session.commit()
+    await session.run_sync(invalidate_user, user.id)
     return Message(message="Password updated successfully")
 
 
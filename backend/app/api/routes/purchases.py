@@ -1,52 +1,138 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, TypeVar
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlmodel import col, select
 
-from app.api.deps import SessionDep
-from app.models import Purchase, PurchaseCreate, PurchasePublic, PurchasesPublic, Message
+from app import crud
+from app.api.deps import AsyncSessionDep
+from app.api.export import ExportFormat, export_response
+from app.api.pagination import CountModeQuery, count_rows, paginate
+from app.core.config import settings
+from app.models import (
+    BulkRowError,
+    Message,
+    Purchase,
+    PurchaseBatchCreate,
+    PurchaseBatchPublic,
+    PurchaseCreate,
+    PurchasePublic,
+    PurchasesPublic,
+)
 
 router = APIRouter()
 
+SelectT = TypeVar("SelectT", bound=Select[Any])
+
+
+def filter_dates(
+    statement: SelectT, date_from: datetime | None, date_to: datetime | None
+) -> SelectT:
+    """
+    Restrict `statement` to purchases dated in [date_from, date_to), which
+    is served by the index on the purchase date.
+    """
+    if date_from is not None:
+        statement = statement.where(col(Purchase.date) >= date_from)
+    if date_to is not None:
+        statement = statement.where(col(Purchase.date) < date_to)
+    return statement
+
 
 @router.get("/", response_model=PurchasesPublic)
-def read_purchases(
-    session: SessionDep, skip: int = 0, limit: int = 100
+async def read_purchases(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
+    date_from: datetime | None = Query(default=None, alias="from"),
+    date_to: datetime | None = Query(default=None, alias="to"),
 ) -> Any:
     """
-    Retrieve purchases.
+    Retrieve purchases, optionally from (inclusive) / to (exclusive) a date.
     """
-    count_statement = select(func.count()).select_from(Purchase)
-    count = session.exec(count_statement).one()
-    statement = select(Purchase).offset(skip).limit(limit)
-    purchases = session.exec(statement).all()
+    statement = filter_dates(select(Purchase), date_from, date_to)
+    count = await session.run_sync(count_rows, statement, Purchase, count_mode)
+    purchases, next_cursor = await session.run_sync(
+        paginate, statement, Purchase, skip=skip, limit=limit, after=after
+    )
 
-    return PurchasesPublic(data=purchases, count=count)
+    return PurchasesPublic(data=purchases, count=count, next_cursor=next_cursor)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+    },
+)
+async def export_purchases(
+    format: ExportFormat = "ndjson",
+    store_id: int | None = None,
+    date_from: datetime | None = Query(default=None, alias="from"),
+    date_to: datetime | None = Query(default=None, alias="to"),
+) -> Any:
+    """
+    Export purchases as NDJSON or CSV, optionally for one store and from
+    (inclusive) / to (exclusive) a date.
+
+    The response is streamed in id order as rows are read, whatever their
+    number.
+    """
+    statement = select(*Purchase.__table__.c).order_by(col(Purchase.id))  # type: ignore[attr-defined]
+    if store_id is not None:
+        statement = statement.where(col(Purchase.store_id) == store_id)
+    statement = filter_dates(statement, date_from, date_to)
+    return export_response(statement, format, "purchases")
 
 
 @router.post("/", response_model=PurchasePublic)
-def create_purchase(
-    *, session: SessionDep, purchase_in: PurchaseCreate
+async def create_purchase(
+    *, session: AsyncSessionDep, purchase_in: PurchaseCreate
 ) -> Any:
     """
     Create new purchase.
     """
     purchase = Purchase.model_validate(purchase_in)
     session.add(purchase)
-    session.commit()
-    session.refresh(purchase)
+    await session.commit()
+    await session.refresh(purchase)
     return purchase
 
 
+@router.post("/batch", response_model=PurchaseBatchPublic)
+async def ingest_purchases(
+    *, session: AsyncSessionDep, batch_in: PurchaseBatchCreate
+) -> Any:
+    """
+    Record a batch of basket lines and decrement the store stock with them.
+
+    Out of stock lines are skipped and reported by index in `errors`.
+    """
+    purchases, rejected = await session.run_sync(
+        lambda sync_session: crud.ingest_purchases(
+            session=sync_session,
+            lines_in=batch_in.lines,
+            chunk_size=settings.BULK_INSERT_CHUNK_SIZE,
+        )
+    )
+    errors = [BulkRowError(index=index, detail="Out of stock") for index in rejected]
+    return PurchaseBatchPublic(data=purchases, count=len(purchases), errors=errors)
+
+
 @router.delete("/{id}")
-def delete_purchase(session: SessionDep, id: int) -> Message:
+async def delete_purchase(session: AsyncSessionDep, id: int) -> Message:
     """
     Delete an purchase.
     """
-    purchase = session.get(Purchase, id)
+    purchase = await session.get(Purchase, id)
     if not purchase:
         raise HTTPException(status_code=404, detail="Purchase not found")
    
-    session.delete(purchase)
-    session.commit()
+    await session.delete(purchase)
+    await session.commit()
     return Message(message="Purchase deleted successfully")
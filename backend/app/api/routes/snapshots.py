@@ -0,0 +1,41 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app import snapshot
+from app.api.deps import get_current_active_superuser
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+router = APIRouter()
+
+
+@router.get(
+    "/{table}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media: {} for media in snapshot.MEDIA_TYPES.values()}}
+    },
+)
+def export_snapshot(table: str, format: snapshot.SnapshotFormat = "parquet") -> Any:
+    """
+    Download a snapshot of an inventory or purchase table as a Parquet or
+    Arrow IPC file, written as it is read.
+    """
+    model = snapshot.SNAPSHOT_TABLES.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    if pa is None:
+        raise HTTPException(
+            status_code=501, detail="Snapshots are not available on this server"
+        )
+    return StreamingResponse(
+        snapshot.stream_snapshot(model, format),
+        media_type=snapshot.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
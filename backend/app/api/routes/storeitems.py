@@ -1,108 +1,140 @@
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
-
-from app.api.deps import SessionDep
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import col, select
+
+from app import crud
+from app.api.deps import AsyncSessionDep
+from app.api.pagination import (
+    CountModeQuery,
+    SortQuery,
+    count_rows,
+    paginate,
+    resolve_sort,
+)
 from app.models import (
     StoreItemsById,
     StoreItemsByIdCreate,
     StoreItemsByIdPublic,
     StoreItemsByIdsPublic,
 )
+from app.valuation import invalidate_valuation
 
 router = APIRouter()
 
 @router.get("/", response_model=StoreItemsByIdsPublic)
-def read_store_items(
-    session: SessionDep, skip: int = 0, limit: int = 100
+async def read_store_items(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
 ) -> Any:
     """
     Retrieve store items.
     """
-    count_statement = select(func.count()).select_from(StoreItemsById)
-    count = session.exec(count_statement).one()
-    statement = select(StoreItemsById).offset(skip).limit(limit)
-    store_items = session.exec(statement).all()
+    statement = select(StoreItemsById)
+    count = await session.run_sync(
+        count_rows, statement, StoreItemsById, count_mode
+    )
+    store_items, next_cursor = await session.run_sync(
+        paginate,
+        statement,
+        StoreItemsById,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
 
-    return StoreItemsByIdsPublic(data=store_items, count=count)
+    return StoreItemsByIdsPublic(
+        data=store_items, count=count, next_cursor=next_cursor
+    )
 
 
 @router.get("/{id}", response_model=StoreItemsByIdsPublic)
-def read_store_items_by_id(
-    session: SessionDep, id: int, skip: int = 0, limit: int = 100
+async def read_store_items_by_id(
+    session: AsyncSessionDep,
+    id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
+    quantity_below: int | None = None,
+    item_id: list[int] | None = Query(None),
+    sort: SortQuery = "id",
 ) -> Any:
     """
     Get store items by ID.
+
+    Optionally filtered to the items with fewer than `quantity_below`
+    units or to the given `item_id`s, and sorted by `sort`.
     """
+    resolve_sort(StoreItemsById, sort, ["store_id"])
+    statement = select(StoreItemsById).where(StoreItemsById.store_id == id)
+    if quantity_below is not None:
+        statement = statement.where(StoreItemsById.quantity < quantity_below)
+    if item_id is not None:
+        statement = statement.where(col(StoreItemsById.item_id).in_(item_id))
+
     # Count the total number of matching records
-    count_statement = (
-        select(func.count())
-        .select_from(StoreItemsById)
-        .where(StoreItemsById.store_id == id)
+    count = await session.run_sync(
+        count_rows, statement, StoreItemsById, count_mode
     )
-    count = session.exec(count_statement).one()
 
     # Retrieve the matching records
-    statement = (
-        select(StoreItemsById)
-        .where(StoreItemsById.store_id == id)
-        .offset(skip)
-        .limit(limit)
+    store_items, next_cursor = await session.run_sync(
+        paginate,
+        statement,
+        StoreItemsById,
+        skip=skip,
+        limit=limit,
+        after=after,
+        sort=sort,
     )
-    store_items = session.exec(statement).all()
 
     # Return the records in an array
-    return StoreItemsByIdsPublic(data=store_items, count=count)
+    return StoreItemsByIdsPublic(
+        data=store_items, count=count, next_cursor=next_cursor
+    )
 
 
 @router.post("/", response_model=StoreItemsByIdPublic)
-def add_items_to_store(
-    session: SessionDep, store_item: StoreItemsByIdCreate
+async def add_items_to_store(
+    session: AsyncSessionDep, store_item: StoreItemsByIdCreate
 ) -> Any:
     """
     Add an item to a store.
     """
-    # Check if the item already exists in this store
-    existing_store_item = (
-        session.query(StoreItemsById)
-        .filter_by(
-            store_id=store_item.store_id, item_id=store_item.item_id
+    # Insert the row or add to its quantity in a single statement
+    try:
+        [store_item_db] = await session.run_sync(
+            lambda sync_session: crud.upsert_stock(
+                session=sync_session, model=StoreItemsById, rows_in=[store_item]
+            )
         )
-        .first()
-    )
-
-    if existing_store_item:
-        # If the item already exists, replace its quantity
-        existing_store_item.quantity += store_item.quantity
-        session.commit()  # Save the changes to the database
-        session.refresh(
-            existing_store_item
-        )  # Refresh the instance with new database values
-        return existing_store_item
-
-    # Create and add a new item
-    new_store_item = StoreItemsById(**store_item.dict())
-    session.add(new_store_item)  # Add new item to the session
-    session.commit()  # Save it to the database
-    session.refresh(new_store_item)  # Refresh the instance with new database values
-
-    return new_store_item
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail="Store or item not found")
+    return store_item_db
 
 @router.put("/{id}", response_model=StoreItemsByIdPublic)
-def update_store_item(
-    *, session: SessionDep, id: int, store_in: StoreItemsById
+async def update_store_item(
+    *, session: AsyncSessionDep, id: int, store_in: StoreItemsById
 ) -> Any:
     """
     Update an store item.
     """
-    store_item = session.get(StoreItemsById, id)
+    store_item = await session.get(StoreItemsById, id)
     if not store_item:
         raise HTTPException(status_code=404, detail="Store Item not found")
 
+    store_ids = {store_item.store_id}
     update_dict = store_in.model_dump(exclude_unset=True)
     store_item.sqlmodel_update(update_dict)
     session.add(store_item)
-    session.commit()
-    session.refresh(store_item)
+    await session.commit()
+    await session.refresh(store_item)
+    store_ids.add(store_item.store_id)
+    await session.run_sync(invalidate_valuation, "store", store_ids)
     return store_item
\ No newline at end of file
@@ -1,27 +1,38 @@
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
 
+from app.api.conditional import conditional_get
 from app.api.deps import SessionDep
+from app.api.pagination import CountModeQuery, count_rows, paginate
 from app.models import Store, StoreCreate, StorePublic, StoresPublic, StoreUpdate, Message
 
 router = APIRouter()
 
 
-@router.get("/", response_model=StoresPublic)
+@router.get(
+    "/",
+    response_model=StoresPublic,
+)
 def read_stores(
-    session: SessionDep, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    version: Annotated[int, Depends(conditional_get(Store))],
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
 ) -> Any:
     """
     Retrieve stores.
     """
-    count_statement = select(func.count()).select_from(Store)
-    count = session.exec(count_statement).one()
-    statement = select(Store).offset(skip).limit(limit)
-    stores = session.exec(statement).all()
+    statement = select(Store)
+    count = count_rows(session, statement, Store, count_mode, version)
+    stores, next_cursor = paginate(
+        session, statement, Store, skip=skip, limit=limit, after=after
+    )
 
-    return StoresPublic(data=stores, count=count)
+    return StoresPublic(data=stores, count=count, next_cursor=next_cursor)
 
 
 @router.get("/{id}", response_model=StorePublic)
@@ -0,0 +1,61 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from psycopg.errors import LockNotAvailable
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import crud, replenishment
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.models import ReplenishmentPlanPublic, TransferCreate, TransferPublic
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+router = APIRouter()
+
+
+@router.post("/", response_model=TransferPublic)
+def create_transfer(session: SessionDep, transfer_in: TransferCreate) -> Any:
+    """
+    Move items from a warehouse to a store in a single transaction.
+    """
+    try:
+        warehouse_items, store_items = crud.transfer_stock(
+            session=session, transfer_in=transfer_in
+        )
+    except crud.InsufficientStockError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Insufficient warehouse stock for items: {e.item_ids}",
+        )
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Store not found")
+    except OperationalError as e:
+        session.rollback()
+        if isinstance(e.orig, LockNotAvailable):
+            raise HTTPException(
+                status_code=409, detail="Warehouse stock is busy, please retry"
+            )
+        raise
+
+    return TransferPublic(warehouse_items=warehouse_items, store_items=store_items)
+
+
+@router.get(
+    "/plan",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=ReplenishmentPlanPublic,
+)
+def plan_transfers(session: SessionDep) -> Any:
+    """
+    Propose the transfers bringing every store item at or below its
+    reorder point back up, from the warehouses holding the item.
+    """
+    if np is None:
+        raise HTTPException(
+            status_code=501, detail="Replenishment is not available on this server"
+        )
+    return replenishment.plan(session)
@@ -1,18 +1,21 @@
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select
 
 from app import crud
 from app.api.deps import (
+    AsyncSessionDep,
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
+    invalidate_user,
 )
+from app.api.pagination import CountModeQuery, count_rows, paginate
+from app.core import hashing
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
@@ -33,40 +36,57 @@ router = APIRouter()
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
+) -> Any:
     """
     Retrieve users.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    statement = select(User)
+    count = count_rows(session, statement, User, count_mode)
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    users, next_cursor = paginate(
+        session, statement, User, skip=skip, limit=limit, after=after
+    )
 
-    return UsersPublic(data=users, count=count)
+    return UsersPublic(data=users, count=count, next_cursor=next_cursor)
 
 
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(*, session: AsyncSessionDep, user_in: UserCreate) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(
+            session=sync_session, email=user_in.email
+        )
+    )
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
+    hashed_password = await hashing.hash_password(user_in.password)
+    user = await session.run_sync(
+        lambda sync_session: crud.create_user(
+            session=sync_session, user_create=user_in, hashed_password=hashed_password
+        )
+    )
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        await run_in_threadpool(
+            send_email,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -93,26 +113,31 @@ def update_user_me(
     session.add(current_user)
     session.commit()
     session.refresh(current_user)
+    invalidate_user(session, current_user.id)
     return current_user
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
+async def update_password_me(
     *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    verified, _ = await hashing.verify_password(
+        body.current_password, current_user.hashed_password
+    )
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
-    current_user.hashed_password = hashed_password
+    current_user.hashed_password = await hashing.hash_password(body.new_password)
+    # current_user belongs to the sync session of the dependency
     session.add(current_user)
-    session.commit()
+    await run_in_threadpool(session.commit)
+    await run_in_threadpool(invalidate_user, session, current_user.id)
     return Message(message="Password updated successfully")
 
 
@@ -133,15 +158,15 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item)
-    session.exec(statement)  # type: ignore
+    user_id = current_user.id
     session.delete(current_user)
     session.commit()
+    invalidate_user(session, user_id)
     return Message(message="User deleted successfully")
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: AsyncSessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
@@ -150,14 +175,25 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
             status_code=403,
             detail="Open user registration is forbidden on this server",
         )
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(
+            session=sync_session, email=user_in.email
+        )
+    )
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
     user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    hashed_password = await hashing.hash_password(user_create.password)
+    user = await session.run_sync(
+        lambda sync_session: crud.create_user(
+            session=sync_session,
+            user_create=user_create,
+            hashed_password=hashed_password,
+        )
+    )
     return user
 
 
@@ -184,9 +220,9 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserPublic,
 )
-def update_user(
+async def update_user(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_id: int,
     user_in: UserUpdate,
 ) -> Any:
@@ -194,21 +230,37 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(User, user_id)
+    db_user = await session.get(User, user_id)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        email = user_in.email
+        existing_user = await session.run_sync(
+            lambda sync_session: crud.get_user_by_email(
+                session=sync_session, email=email
+            )
+        )
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
-    return db_user
+    hashed_password = None
+    if user_in.password:
+        hashed_password = await hashing.hash_password(user_in.password)
+    user = await session.run_sync(
+        lambda sync_session: crud.update_user(
+            session=sync_session,
+            db_user=db_user,
+            user_in=user_in,
+            hashed_password=hashed_password,
+        )
+    )
+    await session.run_sync(invalidate_user, user_id)
+    return user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
@@ -226,8 +278,7 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item)
-    session.exec(statement)  # type: ignore
     session.delete(user)
     session.commit()
+    invalidate_user(session, user_id)
     return Message(message="User deleted successfully")
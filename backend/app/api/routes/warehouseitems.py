@@ -1,98 +1,163 @@
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
-
-from app.api.deps import SessionDep
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import col, select
+
+from app import crud
+from app.api.deps import AsyncSessionDep
+from app.api.pagination import (
+    CountModeQuery,
+    SortQuery,
+    count_rows,
+    paginate,
+    resolve_sort,
+)
+from app.core.config import settings
 from app.models import WarehouseItemsById, WarehouseItemsByIdCreate, WarehouseItemsByIdPublic, WarehouseItemsByIdsPublic, WarehouseItemsByIdUpdate, Message
+from app.valuation import invalidate_valuation
 
 router = APIRouter()
 
 @router.get("/", response_model=WarehouseItemsByIdsPublic)
-def read_warehouse_items(
-    session: SessionDep, skip: int = 0, limit: int = 100
+async def read_warehouse_items(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
 ) -> Any:
     """
     Retrieve warehouse items.
     """
-    count_statement = select(func.count()).select_from(WarehouseItemsById)
-    count = session.exec(count_statement).one()
-    statement = select(WarehouseItemsById).offset(skip).limit(limit)
-    warehouse_items = session.exec(statement).all()
-
-    return WarehouseItemsByIdsPublic(data=warehouse_items, count=count)
+    statement = select(WarehouseItemsById)
+    count = await session.run_sync(
+        count_rows, statement, WarehouseItemsById, count_mode
+    )
+    warehouse_items, next_cursor = await session.run_sync(
+        paginate,
+        statement,
+        WarehouseItemsById,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
+
+    return WarehouseItemsByIdsPublic(
+        data=warehouse_items, count=count, next_cursor=next_cursor
+    )
 
 @router.get("/{id}", response_model=WarehouseItemsByIdsPublic)
-def read_warehouse_items_by_id(session: SessionDep, id: int, skip: int = 0, limit: int = 100) -> Any:
+async def read_warehouse_items_by_id(
+    session: AsyncSessionDep,
+    id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
+    quantity_below: int | None = None,
+    item_id: list[int] | None = Query(None),
+    sort: SortQuery = "id",
+) -> Any:
     """
     Get warehouse items by ID.
+
+    Optionally filtered to the items with fewer than `quantity_below`
+    units or to the given `item_id`s, and sorted by `sort`.
     """
+    resolve_sort(WarehouseItemsById, sort, ["warehouse_id"])
+    statement = select(WarehouseItemsById).where(WarehouseItemsById.warehouse_id == id)
+    if quantity_below is not None:
+        statement = statement.where(WarehouseItemsById.quantity < quantity_below)
+    if item_id is not None:
+        statement = statement.where(col(WarehouseItemsById.item_id).in_(item_id))
+
     # Count the total number of matching records
-    count_statement = select(func.count()).select_from(WarehouseItemsById).where(WarehouseItemsById.warehouse_id == id)
-    count = session.exec(count_statement).one()
+    count = await session.run_sync(
+        count_rows, statement, WarehouseItemsById, count_mode
+    )
 
     # Retrieve the matching records
-    statement = select(WarehouseItemsById).where(WarehouseItemsById.warehouse_id == id).offset(skip).limit(limit)
-    warehouse_items = session.exec(statement).all()
+    warehouse_items, next_cursor = await session.run_sync(paginate, statement, WarehouseItemsById, skip=skip, limit=limit, after=after, sort=sort)
 
     # Return the records in an array
-    return WarehouseItemsByIdsPublic(data=warehouse_items, count=count)
+    return WarehouseItemsByIdsPublic(
+        data=warehouse_items, count=count, next_cursor=next_cursor
+    )
 
 @router.post("/", response_model=WarehouseItemsByIdPublic)
-def add_items_to_warehouse(session: SessionDep, warehouse_item: WarehouseItemsByIdCreate) -> Any:
+async def add_items_to_warehouse(session: AsyncSessionDep, warehouse_item: WarehouseItemsByIdCreate) -> Any:
     """
     Add an item to a warehouse.
     """
-    # Check if the item already exists in this warehouse
-    existing_warehouse_item = session.query(WarehouseItemsById).filter_by(
-        warehouse_id=warehouse_item.warehouse_id, 
-        item_id=warehouse_item.item_id
-    ).first()
-
-    if existing_warehouse_item:
-        # If the item already exists, replace its quantity
-        existing_warehouse_item.quantity += warehouse_item.quantity
-        session.commit() # Save the changes to the database
-        session.refresh(existing_warehouse_item) # Refresh the instance with new database values
-        return existing_warehouse_item
-
-    # Create and add a new item
-    new_warehouse_item = WarehouseItemsById(**warehouse_item.dict())
-    session.add(new_warehouse_item) # Add new item to the session
-    session.commit() # Save it to the database
-    session.refresh(new_warehouse_item) # Refresh the instance with new database values
-
-    return new_warehouse_item
+    # Insert the row or add to its quantity in a single statement
+    try:
+        [warehouse_item_db] = await session.run_sync(
+            lambda sync_session: crud.upsert_stock(
+                session=sync_session, model=WarehouseItemsById, rows_in=[warehouse_item]
+            )
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail="Warehouse or item not found")
+    return warehouse_item_db
+
+
+@router.post("/bulk", response_model=WarehouseItemsByIdsPublic)
+async def add_items_to_warehouse_bulk(session: AsyncSessionDep, warehouse_items: list[WarehouseItemsByIdCreate]) -> Any:
+    """
+    Add a whole manifest of items to warehouses in one transaction.
+    """
+    try:
+        warehouse_items_db = await session.run_sync(
+            lambda sync_session: crud.upsert_stock(
+                session=sync_session,
+                model=WarehouseItemsById,
+                rows_in=warehouse_items,
+                chunk_size=settings.BULK_INSERT_CHUNK_SIZE,
+            )
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Unknown warehouse or item in manifest")
+
+    return WarehouseItemsByIdsPublic(data=warehouse_items_db, count=len(warehouse_items_db))
 
 
 @router.put("/{id}", response_model=WarehouseItemsByIdPublic)
-def update_warehouse_item(
-    *, session: SessionDep, id: int, warehouse_in: WarehouseItemsById
+async def update_warehouse_item(
+    *, session: AsyncSessionDep, id: int, warehouse_in: WarehouseItemsById
 ) -> Any:
     """
     Update an warehouse item.
     """
-    warehouse_item = session.get(WarehouseItemsById, id)
+    warehouse_item = await session.get(WarehouseItemsById, id)
     if not warehouse_item:
         raise HTTPException(status_code=404, detail="Warehouse Item not found")
 
+    warehouse_ids = {warehouse_item.warehouse_id}
     update_dict = warehouse_in.model_dump(exclude_unset=True)
     warehouse_item.sqlmodel_update(update_dict)
     session.add(warehouse_item)
-    session.commit()
-    session.refresh(warehouse_item)
+    await session.commit()
+    await session.refresh(warehouse_item)
+    warehouse_ids.add(warehouse_item.warehouse_id)
+    await session.run_sync(invalidate_valuation, "warehouse", warehouse_ids)
     return warehouse_item
 
 
 @router.delete("/{id}")
-def delete_warehouse_item(session: SessionDep, id: int) -> Message:
+async def delete_warehouse_item(session: AsyncSessionDep, id: int) -> Message:
     """
     Delete a warehouse item.
     """
-    warehouse_item = session.get(WarehouseItemsById, id)
+    warehouse_item = await session.get(WarehouseItemsById, id)
     if not warehouse_item:
         raise HTTPException(status_code=404, detail="Warehouse item not found")
 
-    session.delete(warehouse_item)
-    session.commit()
+    await session.delete(warehouse_item)
+    await session.commit()
+    await session.run_sync(
+        invalidate_valuation, "warehouse", [warehouse_item.warehouse_id]
+    )
     return Message(message="Warehouse item deleted successfully")
@@ -1,27 +1,38 @@
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
 
+from app.api.conditional import conditional_get
 from app.api.deps import SessionDep
+from app.api.pagination import CountModeQuery, count_rows, paginate
 from app.models import Warehouse, WarehouseCreate, WarehousePublic, WarehousesPublic, WarehouseUpdate, Message
 
 router = APIRouter()
 
 
-@router.get("/", response_model=WarehousesPublic)
+@router.get(
+    "/",
+    response_model=WarehousesPublic,
+)
 def read_warehouses(
-    session: SessionDep, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    version: Annotated[int, Depends(conditional_get(Warehouse))],
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    count_mode: CountModeQuery = "exact",
 ) -> Any:
     """
     Retrieve warehouses.
     """
-    count_statement = select(func.count()).select_from(Warehouse)
-    count = session.exec(count_statement).one()
-    statement = select(Warehouse).offset(skip).limit(limit)
-    warehouses = session.exec(statement).all()
+    statement = select(Warehouse)
+    count = count_rows(session, statement, Warehouse, count_mode, version)
+    warehouses, next_cursor = paginate(
+        session, statement, Warehouse, skip=skip, limit=limit, after=after
+    )
 
-    return WarehousesPublic(data=warehouses, count=count)
+    return WarehousesPublic(data=warehouses, count=count, next_cursor=next_cursor)
 
 
 @router.get("/{id}", response_model=WarehousePublic)
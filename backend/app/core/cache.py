@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    Routes run in the threadpool, so every access takes the lock; values
+    are expected to be cheap to store and immutable once cached.
+
+    With `maxbytes`, entries are also evicted once the sizes reported by
+    `sizeof` add up to more than that.
+
+    A value loaded while its key was invalidated would be stale once set.
+    Readers take `generation(key)` before loading it and pass it to `set`,
+    which then skips the value if `pop` or `clear` ran in between.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        maxbytes: int = 0,
+        sizeof: Callable[[V], int] | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._data: OrderedDict[K, tuple[float, V, int]] = OrderedDict()
+        # Invalidations seen per key, and in total for clears
+        self._generations: dict[K, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, key: K) -> tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key: K, value: V, generation: tuple[int, int] | None = None) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.maxbytes and size > self.maxbytes:
+            return
+        with self._lock:
+            if generation is not None and generation != (
+                self._epoch,
+                self._generations.get(key, 0),
+            ):
+                return
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (
+                self.maxbytes and self.bytes > self.maxbytes
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+            self.bytes = 0
+
+    def _remove(self, key: K) -> None:
+        self.bytes -= self._data.pop(key)[2]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ShardedTTLCache(Generic[K, V]):
+    """
+    `TTLCache` split into shards by key hash, each with its own lock, for
+    caches read by many threads at once.
+
+    The limits are divided evenly between the shards.
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        maxsize: int,
+        ttl: float,
+        maxbytes: int = 0,
+        sizeof: Callable[[V], int] | None = None,
+    ) -> None:
+        self._shards: list[TTLCache[K, V]] = [
+            TTLCache(
+                maxsize=-(-maxsize // shards),
+                ttl=ttl,
+                maxbytes=-(-maxbytes // shards),
+                sizeof=sizeof,
+            )
+            for _ in range(shards)
+        ]
+
+    def _shard(self, key: K) -> TTLCache[K, V]:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key: K) -> V | None:
+        return self._shard(key).get(key)
+
+    def generation(self, key: K) -> tuple[int, int]:
+        return self._shard(key).generation(key)
+
+    def set(self, key: K, value: V, generation: tuple[int, int] | None = None) -> None:
+        self._shard(key).set(key, value, generation)
+
+    def pop(self, key: K) -> None:
+        self._shard(key).pop(key)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.clear()
+
+    @property
+    def hits(self) -> int:
+        return sum(shard.hits for shard in self._shards)
+
+    @property
+    def misses(self) -> int:
+        return sum(shard.misses for shard in self._shards)
+
+    @property
+    def bytes(self) -> int:
+        return sum(shard.bytes for shard in self._shards)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
@@ -66,6 +66,69 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Connection pool of each engine, a worker holds up to
+    # 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections (sync and async engines)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    # Seconds before a connection is replaced, -1 keeps connections forever
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    # Server side statement_timeout for every connection, 0 disables it
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Exact list counts are cached per filter for this many seconds, 0 disables
+    COUNT_CACHE_TTL_SECONDS: float = 5
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+    # Rows per multi-row INSERT issued by the bulk endpoints
+    BULK_INSERT_CHUNK_SIZE: int = 1000
+    # Rows fetched per round trip from the server-side cursor of exports
+    EXPORT_YIELD_PER: int = 5000
+    # Rejected rows listed in a CSV import report, the rest are only counted
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+    # Rows per Arrow record batch (and Parquet row group) of snapshots
+    SNAPSHOT_BATCH_ROWS: int = 65536
+    # Demand forecasts: days of sales history, moving average window,
+    # smoothing factor, replenishment lead time and the share of lead time
+    # demand variations covered by the safety stock
+    FORECAST_HISTORY_DAYS: int = 56
+    FORECAST_WINDOW_DAYS: int = 28
+    FORECAST_SMOOTHING_ALPHA: float = 0.3
+    FORECAST_LEAD_TIME_DAYS: float = 7
+    FORECAST_SERVICE_LEVEL: float = 0.95
+    # (store, item) series loaded and forecast together
+    FORECAST_BATCH_SERIES: int = 250_000
+    # Days of forecast demand a replenishment adds above the reorder point
+    REPLENISHMENT_REVIEW_DAYS: float = 7
+    # Monthly purchase partitions kept ready ahead of time, and months of
+    # purchases kept before `python -m app.partitions` detaches them (0 = all)
+    PURCHASE_PARTITIONS_AHEAD: int = 3
+    PURCHASE_RETENTION_MONTHS: int = 0
+    # Transfers waiting longer than this for a stock row lock fail fast
+    STOCK_LOCK_TIMEOUT_MS: int = 2000
+
+    # Auth state of users, looked up on every authenticated request
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_MAX_ENTRIES: int = 10_000
+    # Item catalog, read on every item lookup and rarely written
+    ITEM_CACHE_TTL_SECONDS: float = 60
+    ITEM_CACHE_MAX_ENTRIES: int = 100_000
+    ITEM_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    ITEM_CACHE_SHARDS: int = 16
+    # Stock value per location, recomputed once the location's stock changes
+    # Bounds staleness across workers when CACHE_INVALIDATION_NOTIFY is off
+    VALUATION_CACHE_TTL_SECONDS: float = 30
+    VALUATION_CACHE_MAX_ENTRIES: int = 100_000
+    # Propagate cache invalidations to the other workers with LISTEN/NOTIFY
+    CACHE_INVALIDATION_NOTIFY: bool = False
+
+    # bcrypt cost, stored hashes with another cost are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+    # Processes hashing passwords, apart from the request threadpool
+    PASSWORD_HASH_WORKERS: int = 2
+    # Hash jobs queued or running before new ones are rejected with a 503
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -1,10 +1,112 @@
+import time
+from collections.abc import Callable
+from typing import Any, Concatenate, ParamSpec, TypeVar, cast
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
 from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession as _AsyncSession
 
 from app import crud
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class _TimedPoolMixin:
+    """
+    Record how long checkouts wait for a connection, how many of them need
+    an overflow connection and how many time out.
+    """
+
+    metrics_prefix: str
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            entry: ConnectionPoolEntry = super()._do_get()  # type: ignore[misc]
+        except PoolTimeoutError:
+            metrics.inc(f"{self.metrics_prefix}_timeouts_total")
+            raise
+        finally:
+            metrics.inc(
+                f"{self.metrics_prefix}_checkout_wait_seconds_total",
+                time.perf_counter() - started,
+            )
+        metrics.inc(f"{self.metrics_prefix}_checkouts_total")
+        if self.overflow() > 0:  # type: ignore[attr-defined]
+            metrics.inc(f"{self.metrics_prefix}_overflow_checkouts_total")
+        return entry
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    metrics_prefix = "db_pool_sync"
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_prefix = "db_pool_async"
+
+
+def _engine_options() -> dict[str, Any]:
+    options: dict[str, Any] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    # Dates without a zone are read and written as UTC
+    server_options = ["-c timezone=UTC"]
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        server_options.append(
+            f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        )
+    options["connect_args"] = {"options": " ".join(server_options)}
+    return options
+
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=TimedQueuePool,
+    **_engine_options(),
+)
+# Same database through psycopg's async driver, used by the async routes
+async_engine: AsyncEngine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    **_engine_options(),
+)
+
+
+def _register_pool_gauges(prefix: str, pooled_engine: Engine) -> None:
+    # Read through the engine on every snapshot as dispose() replaces its pool
+    def pool() -> QueuePool:
+        return cast(QueuePool, pooled_engine.pool)
+
+    metrics.register_gauge(f"{prefix}_size", lambda: pool().size())
+    metrics.register_gauge(f"{prefix}_checked_out", lambda: pool().checkedout())
+    metrics.register_gauge(f"{prefix}_overflow", lambda: max(pool().overflow(), 0))
+
+
+_register_pool_gauges("db_pool_sync", engine)
+_register_pool_gauges("db_pool_async", async_engine.sync_engine)
+
+
+class AsyncSession(_AsyncSession):
+    """
+    SQLModel's AsyncSession, with `run_sync` typed for the SQLModel Session
+    it actually hands to `fn`, so the sync helpers taking one type check.
+    """
+
+    async def run_sync(
+        self, fn: Callable[Concatenate[Session, P], T], *arg: P.args, **kw: P.kwargs
+    ) -> T:
+        return await super().run_sync(fn, *arg, **kw)  # type: ignore[arg-type]
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
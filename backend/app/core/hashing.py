@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, TypeVar
+
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+class PasswordHashingBusyError(Exception):
+    """
+    Raised when too many password hashing jobs are already pending.
+    """
+
+
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+_lock = threading.Lock()
+
+metrics.register_gauge("password_hash_pending", lambda: _pending)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Workers are spawned rather than forked from a threaded server
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+async def _run(fn: Callable[..., T], *args: Any) -> T:
+    global _executor, _pending
+    with _lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            metrics.inc("password_hash_rejected_total")
+            raise PasswordHashingBusyError()
+        _pending += 1
+    started = time.perf_counter()
+    executor = _get_executor()
+    try:
+        return await asyncio.wrap_future(executor.submit(fn, *args))
+    except BrokenProcessPool:
+        # A worker died, start over with a fresh pool on the next job
+        with _lock:
+            if _executor is executor:
+                _executor = None
+        raise
+    finally:
+        with _lock:
+            _pending -= 1
+        metrics.inc("password_hash_jobs_total")
+        metrics.inc("password_hash_seconds_total", time.perf_counter() - started)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password in the hashing process pool.
+    """
+    return await _run(security.get_password_hash, password)
+
+
+async def verify_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a password in the hashing process pool.
+
+    Along with the result, a new hash is returned when the stored one was
+    made with other bcrypt parameters, to be saved in place of the old one.
+    """
+    return await _run(
+        security.verify_and_update_password, plain_password, hashed_password
+    )
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+import psycopg
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+
+@dataclass
+class _Handler:
+    invalidate: Callable[[str], None]
+    reset: Callable[[], None]
+
+
+_handlers: dict[str, list[_Handler]] = {}
+
+
+def register(
+    topic: str, invalidate: Callable[[str], None], reset: Callable[[], None]
+) -> None:
+    """
+    Route invalidations of `topic` to a cache, several caches may share one.
+
+    `invalidate` drops one key, `reset` drops everything and is used when the
+    listener reconnects, as notifications sent meanwhile are lost.
+    """
+    _handlers.setdefault(topic, []).append(_Handler(invalidate=invalidate, reset=reset))
+
+
+def _dispatch(payload: str) -> None:
+    topic, _, key = payload.partition(":")
+    for handler in _handlers.get(topic, []):
+        handler.invalidate(key)
+
+
+def publish(session: Session, topic: str, key: object) -> None:
+    """
+    Invalidate `key` of `topic` in this worker and, when enabled, in the
+    other workers through Postgres NOTIFY.
+
+    Call it once the change is committed, so that no request can cache the
+    old value again after the invalidation.
+    """
+    publish_many(session, topic, [key])
+
+
+def publish_many(session: Session, topic: str, keys: Iterable[object]) -> None:
+    """
+    `publish` several keys of `topic`, with a single round trip for NOTIFY.
+    """
+    payloads = [f"{topic}:{key}" for key in keys]
+    for payload in payloads:
+        _dispatch(payload)
+    if settings.CACHE_INVALIDATION_NOTIFY and payloads:
+        session.execute(
+            text(
+                "SELECT pg_notify(:channel, payload) "
+                "FROM unnest(CAST(:payloads AS text[])) payload"
+            ),
+            {"channel": CHANNEL, "payloads": payloads},
+        )
+        session.commit()
+
+
+def _listen() -> None:
+    while True:
+        try:
+            with psycopg.connect(
+                host=settings.POSTGRES_SERVER,
+                port=settings.POSTGRES_PORT,
+                user=settings.POSTGRES_USER,
+                password=settings.POSTGRES_PASSWORD,
+                dbname=settings.POSTGRES_DB,
+                autocommit=True,
+            ) as connection:
+                connection.execute(f"LISTEN {CHANNEL}")
+                # Anything may have changed while not listening
+                for handlers in _handlers.values():
+                    for handler in handlers:
+                        handler.reset()
+                for notify in connection.notifies():
+                    _dispatch(notify.payload)
+        except psycopg.Error:
+            logger.exception("Cache invalidation listener lost its connection")
+            time.sleep(1)
+
+
+def start_listener() -> None:
+    """
+    Apply the invalidations published by other workers to this one.
+    """
+    thread = threading.Thread(
+        target=_listen, name="cache-invalidation-listener", daemon=True
+    )
+    thread.start()
@@ -0,0 +1,36 @@
+import os
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+
+
+class Metrics:
+    """
+    Process-local counters and gauges.
+
+    Each worker process keeps its own values, so the snapshot includes the
+    pid for telling workers apart when scraping several of them.
+    """
+
+    def __init__(self) -> None:
+        self._counters: defaultdict[str, float] = defaultdict(float)
+        self._gauges: dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        self._gauges[name] = read
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            values = dict(self._counters)
+        for name, read in self._gauges.items():
+            values[name] = float(read())
+        values["pid"] = os.getpid()
+        return dict(sorted(values.items()))
+
+
+metrics = Metrics()
@@ -0,0 +1,90 @@
+import threading
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+
+
+def id_name_pairs(rows: Iterable[tuple[int | None, str]]) -> list[tuple[int, str]]:
+    """
+    (id, name) tuples of selected rows, whose ids are typed optional by
+    their model but are always set once stored.
+    """
+    return [(id, name) for id, name in rows if id is not None]
+
+
+class PrefixIndex:
+    """
+    Thread-safe sorted list of (casefolded name, id) for prefix lookups by
+    binary search.
+
+    Filled once with `load`, then kept current id by id: `invalidate` marks
+    an id whose name may have changed, and whoever holds a database session
+    reloads the ids returned by `take_pending` with `update`. `reset` asks
+    for a full `load` again. `version` records the version of the source
+    given to the last `load`.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.version = 0
+        self._entries: list[tuple[str, int]] = []
+        self._names: dict[int, str] = {}
+        self._pending: set[int] = set()
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[tuple[int, str]], version: int = 0) -> None:
+        names = dict(rows)
+        entries = sorted((name.casefold(), id) for id, name in names.items())
+        with self._lock:
+            # Ids invalidated while loading stay pending
+            self._entries = entries
+            self._names = names
+            self.version = version
+            self.loaded = True
+
+    def invalidate(self, id: int) -> None:
+        with self._lock:
+            self._pending.add(id)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.loaded = False
+            self._pending.clear()
+
+    def take_pending(self) -> list[int]:
+        with self._lock:
+            pending = sorted(self._pending)
+            self._pending.clear()
+            return pending
+
+    def update(self, ids: Iterable[int], rows: Iterable[tuple[int, str]]) -> None:
+        """
+        Replace the names of `ids` with `rows`, ids missing from `rows` are
+        removed.
+        """
+        with self._lock:
+            for id in ids:
+                name = self._names.pop(id, None)
+                if name is not None:
+                    entry = (name.casefold(), id)
+                    del self._entries[bisect_left(self._entries, entry)]
+            for id, name in rows:
+                self._names[id] = name
+                insort(self._entries, (name.casefold(), id))
+
+    def search(self, prefix: str, limit: int) -> list[tuple[int, str]]:
+        """
+        Ids and names of up to `limit` names starting with `prefix`, ignoring
+        case, in name order.
+        """
+        prefix = prefix.casefold()
+        with self._lock:
+            start = bisect_left(self._entries, (prefix,))
+            found = []
+            for key, id in self._entries[start : start + limit]:
+                if not key.startswith(prefix):
+                    break
+                found.append((id, self._names[id]))
+            return found
+
+    def __len__(self) -> int:
+        return len(self._entries)
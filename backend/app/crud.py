@@ -1,14 +1,66 @@
-from typing import Any
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import timezone
+from typing import Any, TypeVar
 
-from sqlmodel import Session, select
+import sqlalchemy as sa
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    and_,
+    column,
+    func,
+    insert,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, SQLModel, col, select
 
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models import (
+    Item,
+    ItemCreate,
+    Purchase,
+    PurchaseLine,
+    StoreItemsById,
+    StoreItemsByIdCreate,
+    TableVersion,
+    TransferCreate,
+    User,
+    UserCreate,
+    UserUpdate,
+    WarehouseItemsById,
+)
+from app.valuation import STOCK_LOCATION_TYPES, invalidate_valuation
 
+StockT = TypeVar("StockT", WarehouseItemsById, StoreItemsById)
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+STOCK_CONFLICT_COLUMNS = {
+    WarehouseItemsById: ("warehouse_id", "item_id"),
+    StoreItemsById: ("store_id", "item_id"),
+}
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when stock rows are missing or too low for a requested move.
+    """
+
+    def __init__(self, item_ids: list[int]) -> None:
+        super().__init__(f"Insufficient stock for items {item_ids}")
+        self.item_ids = item_ids
+
+
+def create_user(
+    *, session: Session, user_create: UserCreate, hashed_password: str | None = None
+) -> User:
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_create.password)
     db_obj = User.model_validate(
-        user_create, update={"hashed_password": get_password_hash(user_create.password)}
+        user_create, update={"hashed_password": hashed_password}
     )
     session.add(db_obj)
     session.commit()
@@ -16,12 +68,18 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     return db_obj
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+def update_user(
+    *,
+    session: Session,
+    db_user: User,
+    user_in: UserUpdate,
+    hashed_password: str | None = None,
+) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
     extra_data = {}
     if "password" in user_data:
-        password = user_data["password"]
-        hashed_password = get_password_hash(password)
+        if hashed_password is None:
+            hashed_password = get_password_hash(user_data["password"])
         extra_data["hashed_password"] = hashed_password
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
@@ -45,9 +103,325 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+def table_version(session: Session, name: str) -> int:
+    """
+    Current write version of table `name`, 0 when it is not versioned.
+    """
+    version = session.exec(
+        select(TableVersion.version).where(TableVersion.name == name)
+    ).first()
+    return version or 0
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: int) -> Item:
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+def create_items(
+    *, session: Session, items_in: Sequence[ItemCreate], chunk_size: int
+) -> list[Item]:
+    """
+    Insert items with one multi-row INSERT ... RETURNING per chunk and a
+    single commit, instead of a commit and refresh per item.
+    """
+    table = Item.__table__  # type: ignore[attr-defined]
+    statement = insert(table).returning(*table.c, sort_by_parameter_order=True)
+    db_items: list[Item] = []
+    for start in range(0, len(items_in), chunk_size):
+        chunk = [
+            item_in.model_dump() for item_in in items_in[start : start + chunk_size]
+        ]
+        result = session.execute(statement, chunk)
+        db_items.extend(Item(**row._mapping) for row in result)
+    session.commit()
+    return db_items
+
+
+def _upsert_stock_rows(
+    session: Session,
+    model: type[StockT],
+    rows_in: Sequence[SQLModel],
+    chunk_size: int | None,
+) -> list[StockT]:
+    conflict_columns = STOCK_CONFLICT_COLUMNS[model]
+    merged: dict[tuple[Any, ...], dict[str, Any]] = {}
+    for row_in in rows_in:
+        row = row_in.model_dump()
+        key = tuple(row[column] for column in conflict_columns)
+        if key in merged:
+            row["quantity"] += merged[key]["quantity"]
+        merged[key] = row
+    # Sorted so concurrent upserts lock existing rows in the same order
+    rows = [merged[key] for key in sorted(merged)]
+    if not rows:
+        return []
+
+    table = model.__table__  # type: ignore[attr-defined]
+    chunk_size = chunk_size or len(rows)
+    db_rows: list[StockT] = []
+    for start in range(0, len(rows), chunk_size):
+        insert_rows = pg_insert(table).values(rows[start : start + chunk_size])
+        statement = insert_rows.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={"quantity": table.c.quantity + insert_rows.excluded.quantity},
+        ).returning(*table.c)
+        result = session.execute(statement)
+        db_rows.extend(model(**row._mapping) for row in result)
+    return db_rows
+
+
+def upsert_stock(
+    *,
+    session: Session,
+    model: type[StockT],
+    rows_in: Sequence[SQLModel],
+    chunk_size: int | None = None,
+) -> list[StockT]:
+    """
+    Add quantities to the stock rows of a warehouse or store.
+
+    Runs INSERT ... ON CONFLICT DO UPDATE so missing rows are created and
+    existing ones incremented in the database, without a read beforehand
+    and without losing increments under concurrent writers. Rows repeating
+    a (location, item) pair are merged first, as a single statement cannot
+    update the same row twice. Everything is applied in one transaction,
+    with one statement per `chunk_size` rows.
+    """
+    db_rows = _upsert_stock_rows(session, model, rows_in, chunk_size)
+    session.commit()
+    location_column = STOCK_CONFLICT_COLUMNS[model][0]
+    invalidate_valuation(
+        session,
+        STOCK_LOCATION_TYPES[str(model.__tablename__)],
+        (getattr(row, location_column) for row in db_rows),
+    )
+    return db_rows
+
+
+def transfer_stock(
+    *, session: Session, transfer_in: TransferCreate
+) -> tuple[list[WarehouseItemsById], list[StoreItemsById]]:
+    """
+    Move stock from a warehouse to a store in a single transaction.
+
+    The source rows are locked in item order, so concurrent transfers
+    touching the same items queue instead of deadlocking, and waiting is
+    bounded by STOCK_LOCK_TIMEOUT_MS. The whole transfer is rejected with
+    InsufficientStockError if any line would take a row below zero.
+    """
+    quantities: dict[int, int] = defaultdict(int)
+    for line in transfer_in.lines:
+        quantities[line.item_id] += line.quantity
+    item_ids = sorted(quantities)
+
+    session.execute(
+        select(
+            func.set_config("lock_timeout", f"{settings.STOCK_LOCK_TIMEOUT_MS}ms", True)
+        )
+    )
+    locked = session.exec(
+        select(WarehouseItemsById)
+        .where(
+            WarehouseItemsById.warehouse_id == transfer_in.warehouse_id,
+            col(WarehouseItemsById.item_id).in_(item_ids),
+        )
+        .order_by(col(WarehouseItemsById.item_id))
+        .with_for_update()
+    ).all()
+    available = {row.item_id: row for row in locked}
+    short = [
+        item_id
+        for item_id in item_ids
+        if item_id not in available or available[item_id].quantity < quantities[item_id]
+    ]
+    if short:
+        session.rollback()
+        raise InsufficientStockError(short)
+
+    table = WarehouseItemsById.__table__  # type: ignore[attr-defined]
+    amounts = values(
+        column("item_id", Integer), column("quantity", Integer), name="amounts"
+    ).data([(item_id, quantities[item_id]) for item_id in item_ids])
+    result = session.execute(
+        update(table)
+        .where(
+            table.c.warehouse_id == transfer_in.warehouse_id,
+            table.c.item_id == amounts.c.item_id,
+        )
+        .values(quantity=table.c.quantity - amounts.c.quantity)
+        .returning(*table.c)
+    )
+    warehouse_items = sorted(
+        (WarehouseItemsById(**row._mapping) for row in result),
+        key=lambda row: row.item_id,
+    )
+
+    store_items_in = [
+        StoreItemsByIdCreate(
+            store_id=transfer_in.store_id,
+            item_id=item_id,
+            item_name=available[item_id].item_name,
+            warehouse_price=available[item_id].warehouse_price,
+            retail_price=available[item_id].retail_price,
+            quantity=quantities[item_id],
+        )
+        for item_id in item_ids
+    ]
+    store_items = _upsert_stock_rows(session, StoreItemsById, store_items_in, None)
+    session.commit()
+    invalidate_valuation(session, "warehouse", [transfer_in.warehouse_id])
+    invalidate_valuation(session, "store", [transfer_in.store_id])
+    return warehouse_items, store_items
+
+
+def ingest_purchases(
+    *, session: Session, lines_in: Sequence[PurchaseLine], chunk_size: int
+) -> tuple[list[Purchase], list[int]]:
+    """
+    Record point of sale lines and take them out of the store stock.
+
+    Each chunk is a single statement: a CTE locks the matching stock rows in
+    id order and accepts the lines of each row in order, as long as their
+    running total fits its quantity. The stock rows are decremented by the
+    accepted totals with UPDATE ... RETURNING, and one purchase is inserted
+    per accepted line, with prices taken from the stock rows. From the first
+    line a stock row cannot cover, its later lines are rejected as well.
+
+    Returns the purchases in line order and the indexes of the lines
+    rejected as out of stock.
+    """
+    rows = [
+        (
+            index,
+            line.store_id,
+            line.item_id,
+            line.quantity,
+            # Naive dates are UTC, as for the database sessions
+            line.date if line.date.tzinfo else line.date.replace(tzinfo=timezone.utc),
+        )
+        for index, line in enumerate(lines_in)
+    ]
+
+    stock = StoreItemsById.__table__  # type: ignore[attr-defined]
+    purchase = Purchase.__table__  # type: ignore[attr-defined]
+    columns = [
+        "id",
+        "store_id",
+        "item_id",
+        "item_name",
+        "warehouse_price",
+        "retail_price",
+        "quantity",
+        "date",
+    ]
+    purchases: list[Purchase] = []
+    accepted_lines: set[int] = set()
+    for start in range(0, len(rows), chunk_size):
+        lines = values(
+            column("line", Integer),
+            column("store_id", Integer),
+            column("item_id", Integer),
+            column("quantity", Integer),
+            column("date", DateTime(timezone=True)),
+            name="lines",
+        ).data(rows[start : start + chunk_size])
+        locked = (
+            sa.select(stock.c.id, stock.c.store_id, stock.c.item_id, stock.c.quantity)
+            .where(
+                tuple_(stock.c.store_id, stock.c.item_id).in_(
+                    sa.select(lines.c.store_id, lines.c.item_id)
+                )
+            )
+            .order_by(stock.c.id)
+            .with_for_update()
+            .cte("locked")
+        )
+        running = (
+            sa.select(
+                lines,
+                locked.c.id.label("stock_id"),
+                locked.c.quantity.label("available"),
+                func.sum(lines.c.quantity)
+                .over(partition_by=locked.c.id, order_by=lines.c.line)
+                .label("running"),
+            )
+            .join_from(
+                lines,
+                locked,
+                and_(
+                    locked.c.store_id == lines.c.store_id,
+                    locked.c.item_id == lines.c.item_id,
+                ),
+            )
+            .subquery("running")
+        )
+        # Purchase ids are drawn here so that inserted rows map back to lines
+        accepted = (
+            sa.select(
+                running.c.line,
+                running.c.stock_id,
+                running.c.quantity,
+                running.c.date,
+                func.nextval(func.pg_get_serial_sequence("purchase", "id")).label(
+                    "purchase_id"
+                ),
+            )
+            .where(running.c.running <= running.c.available)
+            .cte("accepted")
+        )
+        totals = (
+            sa.select(accepted.c.stock_id, func.sum(accepted.c.quantity).label("units"))
+            .group_by(accepted.c.stock_id)
+            .subquery("totals")
+        )
+        decremented = (
+            update(stock)
+            .where(stock.c.id == totals.c.stock_id)
+            .values(quantity=stock.c.quantity - totals.c.units)
+            .returning(
+                stock.c.id,
+                stock.c.store_id,
+                stock.c.item_id,
+                stock.c.item_name,
+                stock.c.warehouse_price,
+                stock.c.retail_price,
+            )
+            .cte("decremented")
+        )
+        inserted = (
+            insert(purchase)
+            .from_select(
+                columns,
+                sa.select(
+                    accepted.c.purchase_id,
+                    decremented.c.store_id,
+                    decremented.c.item_id,
+                    decremented.c.item_name,
+                    decremented.c.warehouse_price,
+                    decremented.c.retail_price,
+                    accepted.c.quantity,
+                    accepted.c.date,
+                ).join_from(
+                    accepted, decremented, accepted.c.stock_id == decremented.c.id
+                ),
+            )
+            .returning(*purchase.c)
+            .cte("inserted")
+        )
+        statement = (
+            sa.select(accepted.c.line, inserted)
+            .join_from(inserted, accepted, inserted.c.id == accepted.c.purchase_id)
+            .order_by(accepted.c.line)
+        )
+        for row in session.execute(statement):
+            accepted_lines.add(row.line)
+            purchases.append(Purchase(**{name: row._mapping[name] for name in columns}))
+    session.commit()
+    invalidate_valuation(session, "store", (row.store_id for row in purchases))
+
+    rejected = [index for index in range(len(rows)) if index not in accepted_lines]
+    return purchases, rejected
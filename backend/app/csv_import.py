@@ -0,0 +1,199 @@
+"""
+Load CSV files into the item, stock and purchase tables with COPY.
+
+Rows are validated while the file is parsed and streamed to a temporary
+staging table through COPY FROM STDIN, then merged into the target table
+with a single set-based statement:
+
+    python -m app.csv_import warehouseitemsbyid manifest.csv
+
+Stock rows add their quantities to the existing ones like the bulk
+endpoints do. Purchases are imported as history, store stock is left as
+it is.
+"""
+import argparse
+import csv
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+from app.api.bulk import row_error
+from app.core import invalidation
+from app.core.config import settings
+from app.core.db import engine
+from app.models import (
+    BulkRowError,
+    CsvImportPublic,
+    ItemCreate,
+    PurchaseCreate,
+    StoreItemsByIdCreate,
+    WarehouseItemsByIdCreate,
+)
+from app.valuation import STOCK_LOCATION_TYPES, invalidate_valuation
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MODELS: dict[str, type[SQLModel]] = {
+    "item": ItemCreate,
+    "warehouseitemsbyid": WarehouseItemsByIdCreate,
+    "storeitemsbyid": StoreItemsByIdCreate,
+    "purchase": PurchaseCreate,
+}
+
+# Referenced table of each foreign key column, checked before merging
+FOREIGN_KEYS: dict[str, dict[str, str]] = {
+    "item": {},
+    "warehouseitemsbyid": {"warehouse_id": "warehouse", "item_id": "item"},
+    "storeitemsbyid": {"store_id": "store", "item_id": "item"},
+    "purchase": {"store_id": "store", "item_id": "item"},
+}
+
+STOCK_KEYS: dict[str, tuple[str, str]] = {
+    "warehouseitemsbyid": ("warehouse_id", "item_id"),
+    "storeitemsbyid": ("store_id", "item_id"),
+}
+
+STAGING = "import_staging"
+
+
+def _merge_statement(table: str, columns: list[str]) -> str:
+    names = ", ".join(columns)
+    if table not in STOCK_KEYS:
+        return f"INSERT INTO {table} ({names}) SELECT {names} FROM {STAGING}"
+    # Repeated (location, item) rows add up, other values come from the
+    # last of them, as in crud.upsert_stock
+    keys = STOCK_KEYS[table]
+    values = [
+        column
+        if column in keys
+        else "sum(quantity)"
+        if column == "quantity"
+        else f"(array_agg({column} ORDER BY line DESC))[1]"
+        for column in columns
+    ]
+    return (
+        f"INSERT INTO {table} ({names}) "
+        f"SELECT {', '.join(values)} FROM {STAGING} "
+        f"GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)} "
+        f"ON CONFLICT ({', '.join(keys)}) "
+        f"DO UPDATE SET quantity = {table}.quantity + excluded.quantity"
+    )
+
+
+def import_csv(
+    *, session: Session, table: str, lines: Iterable[str]
+) -> CsvImportPublic:
+    """
+    Import the CSV `lines` into `table` and commit.
+
+    The header names the columns. Rows failing validation or referencing a
+    missing location or item are skipped and reported by index, the first
+    IMPORT_MAX_REPORTED_ERRORS of them in detail.
+    """
+    started = time.perf_counter()
+    model = IMPORT_MODELS[table]
+    columns = list(model.model_fields)
+    errors: list[BulkRowError] = []
+
+    def valid_rows() -> Iterator[tuple[Any, ...]]:
+        for index, row in enumerate(csv.DictReader(lines)):
+            try:
+                row_in = model.model_validate(row)
+            except ValidationError as e:
+                errors.append(row_error(index, e))
+                continue
+            yield (index, *(getattr(row_in, column) for column in columns))
+
+    session.execute(
+        text(
+            f"CREATE TEMP TABLE {STAGING} ON COMMIT DROP AS "
+            f"SELECT 0 AS line, {', '.join(columns)} FROM {table} WITH NO DATA"
+        )
+    )
+    copied = 0
+    driver_connection = session.connection().connection.driver_connection
+    with driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+        with cursor.copy(
+            f"COPY {STAGING} (line, {', '.join(columns)}) FROM STDIN"
+        ) as copy:
+            for values in valid_rows():
+                copy.write_row(values)
+                copied += 1
+
+    orphans: list[int] = []
+    foreign_keys = FOREIGN_KEYS[table]
+    if foreign_keys:
+        missing = " OR ".join(
+            f"NOT EXISTS (SELECT 1 FROM {target} WHERE id = s.{column})"
+            for column, target in foreign_keys.items()
+        )
+        orphans = list(
+            session.execute(
+                text(f"DELETE FROM {STAGING} s WHERE {missing} RETURNING line")
+            ).scalars()
+        )
+        errors.extend(
+            BulkRowError(index=line, detail="Unknown location or item")
+            for line in orphans
+        )
+    location_ids: list[int] = []
+    if table in STOCK_KEYS:
+        location_ids = list(
+            session.execute(
+                text(f"SELECT DISTINCT {STOCK_KEYS[table][0]} FROM {STAGING}")
+            ).scalars()
+        )
+    merge = _merge_statement(table, columns)
+    item_ids: list[int] = []
+    if table == "item":
+        # New names must reach the autocomplete index of every worker
+        item_ids = list(session.execute(text(f"{merge} RETURNING id")).scalars())
+    else:
+        session.execute(text(merge))
+    session.commit()
+    if item_ids:
+        invalidation.publish_many(session, "item", item_ids)
+    if location_ids:
+        invalidate_valuation(session, STOCK_LOCATION_TYPES[table], location_ids)
+
+    count = copied - len(orphans)
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda error: error.index)
+    return CsvImportPublic(
+        count=count,
+        rejected=len(errors),
+        errors=errors[: settings.IMPORT_MAX_REPORTED_ERRORS],
+        elapsed_seconds=elapsed,
+        rows_per_second=count / elapsed if elapsed else 0.0,
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("table", choices=list(IMPORT_MODELS))
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8-sig", newline="") as file:
+        with Session(engine) as session:
+            report = import_csv(session=session, table=args.table, lines=file)
+    for error in report.errors:
+        logger.warning("Row %s rejected: %s", error.index, error.detail)
+    logger.info(
+        "Imported %s rows into %s in %.1f s (%.0f rows/s), %s rejected",
+        report.count,
+        args.table,
+        report.elapsed_seconds,
+        report.rows_per_second,
+        report.rejected,
+    )
+
+
+if __name__ == "__main__":
+    main()
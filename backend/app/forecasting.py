@@ -0,0 +1,289 @@
+"""
+Demand forecasts and reorder points for every item stocked by a store.
+
+Daily sales are read from the salesdaily rollup with binary COPY straight
+into NumPy arrays, a batch of stores at a time, and all the (store, item)
+series of a batch are forecast together with array operations:
+
+    python -m app.forecasting --method exponential_smoothing
+
+A run replaces the content of the forecast table in one transaction, so
+readers keep seeing the previous run until it commits. Needs NumPy,
+installed with the `analytics` extra.
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from statistics import NormalDist
+from typing import Any, Literal
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import ForecastRunPublic
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+ForecastMethod = Literal["moving_average", "exponential_smoothing"]
+
+# Binary COPY framing around the tuples written to the forecast table
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+COPY_TRAILER = b"\xff\xff"
+
+FORECAST_COLUMNS = [
+    ("store_id", ">i4"),
+    ("item_id", ">i4"),
+    ("daily_demand", ">f8"),
+    ("demand_stddev", ">f8"),
+    ("reorder_point", ">f8"),
+]
+
+
+class ForecastingUnavailableError(Exception):
+    """
+    Raised when NumPy is not installed.
+    """
+
+
+@dataclass
+class DemandHistory:
+    store_ids: Any
+    item_ids: Any
+    # Units sold, one row per (store, item) and one column per day
+    units: Any
+    start: date
+
+
+def _tuple_dtype(columns: list[tuple[str, str]]) -> Any:
+    # Binary COPY tuple of non-null fixed size fields: field count, then
+    # the length and value of each field, all big-endian
+    fields = [("count", ">i2")]
+    for name, type_ in columns:
+        fields += [(f"{name}_length", ">i4"), (name, type_)]
+    return np.dtype(fields)
+
+
+def fetch_int4_records(
+    session: Session, query: str, params: dict[str, Any], names: list[str]
+) -> Any:
+    """
+    View the single bytea returned by `query` as an array of records of
+    int4 fields called `names`.
+
+    Packing the rows into one value with `pack_int4` server side spares a
+    message and a Python object per row, NumPy reads the bytes as is.
+    """
+    data = session.connection().exec_driver_sql(query, params).scalar()
+    return np.frombuffer(data or b"", dtype=np.dtype([(n, ">i4") for n in names]))
+
+
+def pack_int4(expressions: list[str], order_by: str = "") -> str:
+    """
+    SQL aggregate packing int4 `expressions` into one bytea, as big-endian
+    fields record after record, for `fetch_int4_records`.
+    """
+    fields = " || ".join(f"int4send({expression})" for expression in expressions)
+    return (
+        f"string_agg({fields}, ''::bytea{f' ORDER BY {order_by}' if order_by else ''})"
+    )
+
+
+def _copy_in(
+    session: Session, table: str, columns: list[tuple[str, str]], values: dict[str, Any]
+) -> None:
+    dtype = _tuple_dtype(columns)
+    tuples = np.empty(len(values[columns[0][0]]), dtype=dtype)
+    tuples["count"] = len(columns)
+    for name, _ in columns:
+        tuples[f"{name}_length"] = dtype[name].itemsize
+        tuples[name] = values[name]
+    names = ", ".join(name for name, _ in columns)
+    driver_connection = session.connection().connection.driver_connection
+    with driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+        with cursor.copy(f"COPY {table} ({names}) FROM STDIN (FORMAT BINARY)") as copy:
+            copy.write(COPY_HEADER + tuples.tobytes() + COPY_TRAILER)
+
+
+def load_history(
+    session: Session, *, first_store: int, last_store: int, start: date, days: int
+) -> DemandHistory:
+    """
+    Daily units sold over `days` days from `start` for every item stocked by
+    the stores with ids between `first_store` and `last_store`.
+
+    Days without sales count as zero, sales of items no longer stocked are
+    left out.
+    """
+    stores = {"first": first_store, "last": last_store}
+    stock = fetch_int4_records(
+        session,
+        f"SELECT {pack_int4(['store_id', 'item_id'], 'store_id, item_id')} "
+        "FROM storeitemsbyid WHERE store_id BETWEEN %(first)s AND %(last)s",
+        stores,
+        ["store_id", "item_id"],
+    )
+    sales = fetch_int4_records(
+        session,
+        f"SELECT {pack_int4(['store_id', 'item_id', 'day - %(start)s::date', 'units'])} "
+        "FROM salesdaily WHERE store_id BETWEEN %(first)s AND %(last)s "
+        "AND day >= %(start)s::date AND day < %(end)s::date",
+        {**stores, "start": start, "end": start + timedelta(days=days)},
+        ["store_id", "item_id", "day", "units"],
+    )
+
+    # (store, item) packed in one int64, sorted like the stock rows
+    keys = stock["store_id"].astype(np.int64) << 32 | stock["item_id"]
+    sale_keys = sales["store_id"].astype(np.int64) << 32 | sales["item_id"]
+    rows = np.searchsorted(keys, sale_keys).clip(max=max(len(keys) - 1, 0))
+    stocked = keys[rows] == sale_keys if len(keys) else np.zeros(0, dtype=bool)
+    units = np.zeros((len(keys), days))
+    units[rows[stocked], sales["day"][stocked]] = sales["units"][stocked]
+    return DemandHistory(
+        store_ids=stock["store_id"].astype(np.int32),
+        item_ids=stock["item_id"].astype(np.int32),
+        units=units,
+        start=start,
+    )
+
+
+def forecast_demand(
+    units: Any, method: ForecastMethod, *, window: int, alpha: float
+) -> Any:
+    """
+    Expected daily units of each row of `units`.
+
+    `moving_average` averages the last `window` days. `exponential_smoothing`
+    is the final level of simple exponential smoothing started at the first
+    day, computed for all rows at once as a weighted sum of the days.
+    """
+    if method == "moving_average":
+        return units[:, -window:].mean(axis=1)
+    days = units.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return units @ weights
+
+
+def reorder_points(
+    demand: Any, stddev: Any, *, lead_time_days: float, service_level: float
+) -> Any:
+    """
+    Stock level at which to reorder: the demand expected over the lead time
+    plus a safety stock covering `service_level` of its variations.
+    """
+    z = NormalDist().inv_cdf(service_level)
+    return demand * lead_time_days + z * stddev * np.sqrt(lead_time_days)
+
+
+def _store_batches(session: Session, batch_series: int) -> list[tuple[int, int]]:
+    # Consecutive store id ranges holding about `batch_series` stock rows each
+    counts = session.connection().exec_driver_sql(
+        "SELECT store_id, count(*) FROM storeitemsbyid GROUP BY store_id "
+        "ORDER BY store_id"
+    )
+    batches: list[tuple[int, int]] = []
+    first, size = None, 0
+    for store_id, count in counts:
+        if first is None:
+            first = store_id
+        size += count
+        if size >= batch_series:
+            batches.append((first, store_id))
+            first, size = None, 0
+    if first is not None:
+        batches.append((first, store_id))
+    return batches
+
+
+def recompute(
+    session: Session, *, method: ForecastMethod, today: date | None = None
+) -> ForecastRunPublic:
+    """
+    Forecast every item stocked by every store from the history of the
+    FORECAST_HISTORY_DAYS full days before `today` (UTC), and replace the
+    forecast table with the results.
+    """
+    if np is None:
+        raise ForecastingUnavailableError("NumPy is not installed")
+    started = time.perf_counter()
+    today = today or datetime.now(timezone.utc).date()
+    days = settings.FORECAST_HISTORY_DAYS
+    start = today - timedelta(days=days)
+
+    count = 0
+    session.connection().exec_driver_sql("DELETE FROM forecast")
+    for first_store, last_store in _store_batches(
+        session, settings.FORECAST_BATCH_SERIES
+    ):
+        history = load_history(
+            session,
+            first_store=first_store,
+            last_store=last_store,
+            start=start,
+            days=days,
+        )
+        demand = forecast_demand(
+            history.units,
+            method,
+            window=settings.FORECAST_WINDOW_DAYS,
+            alpha=settings.FORECAST_SMOOTHING_ALPHA,
+        )
+        stddev = history.units.std(axis=1)
+        _copy_in(
+            session,
+            "forecast",
+            FORECAST_COLUMNS,
+            {
+                "store_id": history.store_ids,
+                "item_id": history.item_ids,
+                "daily_demand": demand,
+                "demand_stddev": stddev,
+                "reorder_point": reorder_points(
+                    demand,
+                    stddev,
+                    lead_time_days=settings.FORECAST_LEAD_TIME_DAYS,
+                    service_level=settings.FORECAST_SERVICE_LEVEL,
+                ),
+            },
+        )
+        count += len(history.store_ids)
+    session.commit()
+
+    elapsed = time.perf_counter() - started
+    return ForecastRunPublic(
+        count=count,
+        elapsed_seconds=elapsed,
+        series_per_second=count / elapsed if elapsed else 0.0,
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--method",
+        choices=["moving_average", "exponential_smoothing"],
+        default="exponential_smoothing",
+    )
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        run = recompute(session, method=args.method)
+    logger.info(
+        "Forecast %s series in %.1f s (%.0f series/s)",
+        run.count,
+        run.elapsed_seconds,
+        run.series_per_second,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+from datetime import date, datetime
+
 from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import DateTime, Index, UniqueConstraint, func
 from sqlalchemy.orm import registry
 
 mapper_registry = registry()
@@ -55,7 +58,8 @@ class UserPublic(UserBase):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 
 # Item model, database table inferred from class name
@@ -81,6 +85,15 @@ class ItemUpdate(ItemBase):
 
 
 class Item(ItemBase, table=True):
+    # Trigram index (pg_trgm) behind the fuzzy mode of /items/search
+    __table_args__ = (
+        Index(
+            "ix_item_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
     id: int | None = Field(default=None, primary_key=True)
     # Relationships
     warehouse_items: list["WarehouseItemsById"] = Relationship(back_populates="item")
@@ -94,8 +107,33 @@ class ItemPublic(ItemBase):
 
 
 class ItemsPublic(SQLModel):
+    data: list[ItemPublic]
+    count: int | None
+    next_cursor: str | None = None
+
+
+# Row rejected by a bulk endpoint, index is its position in the request
+class BulkRowError(SQLModel):
+    index: int
+    detail: str
+
+
+class ItemsBulkPublic(SQLModel):
     data: list[ItemPublic]
     count: int
+    errors: list[BulkRowError]
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class ItemSuggestion(SQLModel):
+    id: int
+    name: str
+
+
+class ItemSuggestionsPublic(SQLModel):
+    data: list[ItemSuggestion]
+    count: int
 
 # Warehouse model, database table inferred from class name
 # Shared properties
@@ -128,7 +166,8 @@ class WarehousePublic(WarehouseBase):
 
 class WarehousesPublic(SQLModel):
     data: list[WarehousePublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 # WarehouseItemsByIdBase
 class WarehouseItemsByIdBase(SQLModel):
@@ -151,6 +190,29 @@ class WarehouseItemsByIdUpdate(WarehouseItemsByIdBase):
     quantity: int | None = None  # type: ignore    
 
 class WarehouseItemsById(WarehouseItemsByIdBase, table=True):    
+    # One stock row per warehouse and item, target of the quantity upsert
+    __table_args__ = (
+        UniqueConstraint(
+            "warehouse_id",
+            "item_id",
+            name="uq_warehouseitemsbyid_warehouse_id_item_id",
+        ),
+        Index("ix_warehouseitemsbyid_warehouse_id_id", "warehouse_id", "id"),
+        Index("ix_warehouseitemsbyid_item_id", "item_id"),
+        # Sort orders of GET /warehouseitems/{id}
+        Index(
+            "ix_warehouseitemsbyid_warehouse_id_quantity_id",
+            "warehouse_id",
+            "quantity",
+            "id",
+        ),
+        Index(
+            "ix_warehouseitemsbyid_warehouse_id_retail_price_id",
+            "warehouse_id",
+            "retail_price",
+            "id",
+        ),
+    )
     id: int | None = Field(default=None, primary_key=True)
     warehouse: Warehouse = Relationship(back_populates="items")
     item: Item = Relationship(back_populates="warehouse_items")
@@ -160,7 +222,8 @@ class WarehouseItemsByIdPublic(WarehouseItemsByIdBase):
 
 class WarehouseItemsByIdsPublic(SQLModel):    
     data: list[WarehouseItemsByIdPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 # Store model, database table inferred from class name
 # Shared properties
@@ -197,7 +260,8 @@ class StorePublic(StoreBase):
 
 class StoresPublic(SQLModel):
     data: list[StorePublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 
 # StoreItemsByIdBase
@@ -221,6 +285,22 @@ class StoreItemsByIdUpdate(StoreItemsByIdBase):
     quantity: int | None = None  # type: ignore    
 
 class StoreItemsById(StoreItemsByIdBase, table=True):    
+    # One stock row per store and item, target of the quantity upsert
+    __table_args__ = (
+        UniqueConstraint(
+            "store_id", "item_id", name="uq_storeitemsbyid_store_id_item_id"
+        ),
+        Index("ix_storeitemsbyid_store_id_id", "store_id", "id"),
+        Index("ix_storeitemsbyid_item_id", "item_id"),
+        # Sort orders of GET /storeitems/{id}
+        Index("ix_storeitemsbyid_store_id_quantity_id", "store_id", "quantity", "id"),
+        Index(
+            "ix_storeitemsbyid_store_id_retail_price_id",
+            "store_id",
+            "retail_price",
+            "id",
+        ),
+    )
     id: int | None = Field(default=None, primary_key=True)
     # relationships
     store: Store = Relationship(back_populates="store_items")
@@ -231,7 +311,33 @@ class StoreItemsByIdPublic(StoreItemsByIdBase):
 
 class StoreItemsByIdsPublic(SQLModel):    
     data: list[StoreItemsByIdPublic]
+    count: int | None
+    next_cursor: str | None = None
+
+# Transfer of stock from a warehouse to a store
+class TransferLine(SQLModel):
+    item_id: int
+    quantity: int = Field(gt=0)
+
+
+class TransferCreate(SQLModel):
+    warehouse_id: int
+    store_id: int
+    lines: list[TransferLine] = Field(min_length=1)
+
+
+class TransferPublic(SQLModel):
+    warehouse_items: list[WarehouseItemsByIdPublic]
+    store_items: list[StoreItemsByIdPublic]
+
+
+# Transfers proposed by app/replenishment.py, `unmet_units` are the units
+# the stores need that no warehouse has
+class ReplenishmentPlanPublic(SQLModel):
+    transfers: list[TransferCreate]
     count: int
+    units: int
+    unmet_units: int
 
 # PurchaseBase
 class PurchaseBase(SQLModel):
@@ -241,7 +347,7 @@ class PurchaseBase(SQLModel):
     warehouse_price: float
     retail_price: float
     quantity: int
-    date: str
+    date: datetime = Field(sa_type=DateTime(timezone=True))  # type: ignore[call-overload]
 
 class PurchaseCreate(PurchaseBase):
     store_id: int = Field(foreign_key="store.id")
@@ -250,9 +356,17 @@ class PurchaseCreate(PurchaseBase):
     warehouse_price: float
     retail_price: float
     quantity: int
-    date: str
+    date: datetime
 
 class Purchase(PurchaseBase, table=True):    
+    # Partitioned by month of date, see app/partitions.py. The database key
+    # is (id, date) as partitioning requires, ids alone remain unique
+    __table_args__ = (
+        Index("ix_purchase_store_id_date", "store_id", "date"),
+        Index("ix_purchase_item_id", "item_id"),
+        Index("ix_purchase_date", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
     id: int | None = Field(default=None, primary_key=True)
     # relationship
     store: Store = Relationship(back_populates="purchases")
@@ -263,8 +377,118 @@ class PurchasePublic(PurchaseBase):
 
 class PurchasesPublic(SQLModel):    
     data: list[PurchasePublic]
+    count: int | None
+    next_cursor: str | None = None
+
+# Basket line sent by a point of sale, prices are taken from the store stock
+class PurchaseLine(SQLModel):
+    store_id: int
+    item_id: int
+    quantity: int = Field(gt=0)
+    date: datetime
+
+
+class PurchaseBatchCreate(SQLModel):
+    lines: list[PurchaseLine] = Field(min_length=1)
+
+
+class PurchaseBatchPublic(SQLModel):
+    data: list[PurchasePublic]
+    count: int
+    errors: list[BulkRowError]
+
+
+class CsvImportPublic(SQLModel):
+    count: int
+    rejected: int
+    errors: list[BulkRowError]
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+# Units sold, revenue and cost per store, item and UTC day, kept up to date
+# by statement triggers on purchase
+class SalesDaily(SQLModel, table=True):
+    __table_args__ = (Index("ix_salesdaily_day", "day"),)
+    store_id: int = Field(primary_key=True)
+    item_id: int = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    units: int
+    revenue: float
+    cost: float
+
+
+# One group of /analytics/sales, keys not grouped by are left out
+class SalesRow(SQLModel):
+    store_id: int | None = None
+    item_id: int | None = None
+    day: date | None = None
+    units: int
+    revenue: float
+    cost: float
+    margin: float
+
+
+class SalesPublic(SQLModel):
+    data: list[SalesRow]
+    count: int | None
+
+
+# Stock on hand of one warehouse or store, at warehouse and retail prices
+class LocationValuation(SQLModel):
+    location_type: str
+    location_id: int
+    units: int
+    warehouse_value: float
+    retail_value: float
+
+
+class ValuationPublic(SQLModel):
+    data: list[LocationValuation]
     count: int
 
+
+# Latest demand forecast of an item stocked by a store, see app/forecasting.py
+class Forecast(SQLModel, table=True):
+    store_id: int = Field(primary_key=True)
+    item_id: int = Field(primary_key=True)
+    daily_demand: float
+    demand_stddev: float
+    reorder_point: float
+    computed_at: datetime = Field(  # type: ignore[call-overload]
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"server_default": func.now()},
+    )
+
+
+class ForecastPublic(SQLModel):
+    store_id: int
+    item_id: int
+    daily_demand: float
+    demand_stddev: float
+    reorder_point: float
+    computed_at: datetime
+    on_hand: int | None
+
+
+class ForecastsPublic(SQLModel):
+    data: list[ForecastPublic]
+    count: int | None
+
+
+class ForecastRunPublic(SQLModel):
+    count: int
+    elapsed_seconds: float
+    series_per_second: float
+
+
+# Bumped by a statement trigger on every write to the named table,
+# used to build ETags of list endpoints without reading their rows
+class TableVersion(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    version: int = 0
+
+
 # Generic message
 class Message(SQLModel):
     message: str
@@ -0,0 +1,208 @@
+"""
+Maintenance of the monthly partitions of the purchase table.
+
+Creates the partitions of the coming months, moves rows that landed in
+the default partition into partitions of their own, and detaches the
+partitions older than the retention period, archiving or dropping them:
+
+    python -m app.partitions --ahead 3 --retention-months 24 [--drop]
+
+Meant to run daily, e.g. from cron; every step is idempotent.
+"""
+import argparse
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import Connection, text
+
+from app.core.config import settings
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARENT = "purchase"
+DEFAULT_PARTITION = "purchase_default"
+ARCHIVE_SCHEMA = "purchase_archive"
+
+_BOUND = re.compile(r"FROM \((.+)\) TO \((.+)\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    # None for MINVALUE / MAXVALUE
+    lower: datetime | None
+    upper: datetime | None
+
+
+def month_start(value: datetime, offset: int = 0) -> datetime:
+    """
+    First instant (UTC) of the month `offset` months after `value`'s.
+    """
+    month = value.year * 12 + value.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_bound(value: str) -> datetime | None:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    # e.g. '2026-11-01 00:00:00+00'
+    return datetime.fromisoformat(value.strip("'").replace("+00", "+00:00"))
+
+
+def list_partitions(connection: Connection) -> list[Partition]:
+    """
+    Range partitions of the purchase table, the default one excluded.
+    """
+    rows = connection.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": PARENT},
+    )
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound)
+        if match:
+            lower, upper = (_parse_bound(value) for value in match.groups())
+            partitions.append(Partition(name=name, lower=lower, upper=upper))
+    return sorted(
+        partitions, key=lambda p: p.lower or datetime.min.replace(tzinfo=timezone.utc)
+    )
+
+
+def _covered(partitions: list[Partition], month: datetime) -> bool:
+    return any(
+        (p.lower is None or p.lower <= month) and (p.upper is None or month < p.upper)
+        for p in partitions
+    )
+
+
+def create_partition(connection: Connection, month: datetime) -> str:
+    """
+    Create the partition of `month`, taking over its rows from the default
+    partition.
+
+    The table is filled and given a CHECK matching its bounds before being
+    attached, so attaching it does not scan it again.
+    """
+    name = f"{PARENT}_p{month:%Y_%m}"
+    lower, upper = month.isoformat(), month_start(month, 1).isoformat()
+    bounds = {"lower": lower, "upper": upper}
+    with connection.begin():
+        connection.execute(text("SET LOCAL lock_timeout = '10s'"))
+        connection.execute(
+            text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)")
+        )
+        connection.execute(
+            text(
+                f"ALTER TABLE {name} ADD CONSTRAINT {name}_bound "
+                f"CHECK (date >= '{lower}' AND date < '{upper}')"
+            )
+        )
+        connection.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE date >= :lower AND date < :upper RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+        connection.execute(
+            text(
+                f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+        )
+        connection.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bound"))
+    return name
+
+
+def detach_partition(connection: Connection, partition: Partition, drop: bool) -> None:
+    """
+    Take `partition` out of the purchase table and drop it, or keep it as a
+    plain table in the archive schema.
+    """
+    with connection.begin():
+        connection.execute(text("SET LOCAL lock_timeout = '10s'"))
+        connection.execute(
+            text(f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name}")
+        )
+        if drop:
+            connection.execute(text(f"DROP TABLE {partition.name}"))
+        else:
+            connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+            connection.execute(
+                text(f"ALTER TABLE {partition.name} SET SCHEMA {ARCHIVE_SCHEMA}")
+            )
+
+
+def maintain(
+    connection: Connection,
+    *,
+    ahead: int,
+    retention_months: int,
+    drop: bool,
+    now: datetime | None = None,
+) -> tuple[list[str], list[str]]:
+    """
+    Run every maintenance step, returning the created and detached
+    partitions. A `retention_months` of 0 keeps every partition.
+    """
+    now = now or datetime.now(timezone.utc)
+    months = {month_start(now, offset) for offset in range(ahead + 1)}
+    with connection.begin():
+        partitions = list_partitions(connection)
+        stray = connection.execute(
+            text(f"SELECT DISTINCT date_trunc('month', date) FROM {DEFAULT_PARTITION}")
+        ).scalars()
+        months.update(month_start(month) for month in stray)
+    created = [
+        create_partition(connection, month)
+        for month in sorted(months)
+        if not _covered(partitions, month)
+    ]
+
+    detached = []
+    if retention_months:
+        cutoff = month_start(now, -retention_months)
+        for partition in partitions:
+            if partition.upper is not None and partition.upper <= cutoff:
+                detach_partition(connection, partition, drop)
+                detached.append(partition.name)
+    return created, detached
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ahead", type=int, default=settings.PURCHASE_PARTITIONS_AHEAD)
+    parser.add_argument(
+        "--retention-months", type=int, default=settings.PURCHASE_RETENTION_MONTHS
+    )
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        help=f"drop expired partitions instead of moving them to {ARCHIVE_SCHEMA}",
+    )
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        created, detached = maintain(
+            connection,
+            ahead=args.ahead,
+            retention_months=args.retention_months,
+            drop=args.drop,
+        )
+    for name in created:
+        logger.info("Created partition %s", name)
+    for name in detached:
+        logger.info("%s partition %s", "Dropped" if args.drop else "Archived", name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Replenishment plan moving warehouse stock to the stores that need it.
+
+Store items at or below their forecast reorder point are brought back up
+to the reorder point plus REPLENISHMENT_REVIEW_DAYS of forecast demand.
+Each item's warehouse stock goes first to the stores with the fewest days
+of cover left, drawn from the best-stocked warehouses first. This greedy
+northwest-corner allocation is computed for every item at once with NumPy.
+
+    python -m app.replenishment [--apply] > plan.ndjson
+
+The plan is written as one TransferCreate per line. With --apply, every
+transfer is also carried out as POST /transfers/ would. Meant to run on a
+schedule, after `python -m app.forecasting`.
+"""
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.forecasting import ForecastingUnavailableError, fetch_int4_records, pack_int4
+from app.models import ReplenishmentPlanPublic, TransferCreate
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Allocation:
+    warehouse_ids: Any
+    store_ids: Any
+    item_ids: Any
+    quantities: Any
+    # Units needed by the stores that no warehouse could provide
+    unmet: int
+
+
+def _firsts(keys: Any) -> Any:
+    # Whether each element of sorted `keys` is the first of its run
+    return np.concatenate(([True], keys[1:] != keys[:-1]))[: len(keys)]
+
+
+def _running_within(values: Any, keys: Any) -> Any:
+    # Running sum of `values` restarting with each run of sorted `keys`
+    running = np.cumsum(values)
+    starts = np.maximum.accumulate(np.where(_firsts(keys), np.arange(len(keys)), 0))
+    return running - running[starts] + values[starts]
+
+
+def allocate(
+    demand_items: Any,
+    demand_stores: Any,
+    demand_units: Any,
+    supply_items: Any,
+    supply_warehouses: Any,
+    supply_units: Any,
+) -> Allocation:
+    """
+    Split the supply of each item between its demands.
+
+    Demands are sorted by item then priority, supplies by item then
+    preference. Each item's shipped units (the lower of its demand and its
+    supply) are laid end to end on one line, once cut by the demands and
+    once by the supplies. Every piece between two consecutive cuts goes
+    from one warehouse to one store, so an item yields at most one line
+    fewer than its demands and supplies together.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(demand_items):
+        return Allocation(empty, empty, empty, empty, unmet=0)
+    demand_units = demand_units.astype(np.int64)
+    supply_units = supply_units.astype(np.int64)
+
+    # Sorted inputs: groups are found from runs, without sorting again
+    first = _firsts(demand_items)
+    items = demand_items[first]
+    demand_groups = np.cumsum(first) - 1
+    demanded = np.add.reduceat(demand_units, np.flatnonzero(first))
+
+    # Supplies of items nobody needs are left out
+    supply_groups = np.searchsorted(items, supply_items).clip(max=len(items) - 1)
+    needed = items[supply_groups] == supply_items
+    supply_groups = supply_groups[needed]
+    supply_items = supply_items[needed]
+    supply_warehouses = supply_warehouses[needed]
+    supply_units = supply_units[needed]
+    available = np.zeros(len(items), dtype=np.int64)
+    np.add.at(available, supply_groups, supply_units)
+
+    shipped = np.minimum(demanded, available)
+    base = np.cumsum(shipped) - shipped
+    demand_ends = base[demand_groups] + np.minimum(
+        _running_within(demand_units, demand_items), shipped[demand_groups]
+    )
+    supply_ends = base[supply_groups] + np.minimum(
+        _running_within(supply_units, supply_items), shipped[supply_groups]
+    )
+
+    # Cuts shared by both sides leave empty pieces, dropped below
+    cuts = np.sort(np.concatenate((demand_ends, supply_ends)))
+    starts = np.concatenate((np.zeros(1, dtype=cuts.dtype), cuts[:-1]))
+    pieces = cuts > starts
+    starts, quantities = starts[pieces], (cuts - starts)[pieces]
+    demand_rows = np.searchsorted(demand_ends, starts, side="right")
+    supply_rows = np.searchsorted(supply_ends, starts, side="right")
+    return Allocation(
+        warehouse_ids=supply_warehouses[supply_rows],
+        store_ids=demand_stores[demand_rows],
+        item_ids=demand_items[demand_rows],
+        quantities=quantities,
+        unmet=int(demanded.sum() - shipped.sum()),
+    )
+
+
+def transfers(allocation: Allocation) -> list[dict[str, Any]]:
+    """
+    Group the allocated lines into one TransferCreate payload per warehouse
+    and store.
+
+    Plain dicts, as validating millions of lines would take longer than
+    planning them.
+    """
+    if not len(allocation.quantities):
+        return []
+    order = np.lexsort(
+        (allocation.item_ids, allocation.store_ids, allocation.warehouse_ids)
+    )
+    warehouse_ids = allocation.warehouse_ids[order].tolist()
+    store_ids = allocation.store_ids[order].tolist()
+    item_ids = allocation.item_ids[order].tolist()
+    quantities = allocation.quantities[order].tolist()
+    pairs = np.flatnonzero(
+        _firsts(allocation.warehouse_ids[order]) | _firsts(allocation.store_ids[order])
+    ).tolist()
+
+    planned = []
+    for start, end in zip(pairs, [*pairs[1:], len(order)], strict=True):
+        lines = [
+            {"item_id": item_id, "quantity": quantity}
+            for item_id, quantity in zip(
+                item_ids[start:end], quantities[start:end], strict=True
+            )
+        ]
+        planned.append(
+            {
+                "warehouse_id": warehouse_ids[start],
+                "store_id": store_ids[start],
+                "lines": lines,
+            }
+        )
+    return planned
+
+
+def load_allocation(session: Session) -> Allocation:
+    """
+    Allocate the current warehouse stock to every store item at or below
+    its reorder point, according to the latest forecasts.
+    """
+    if np is None:
+        raise ForecastingUnavailableError("NumPy is not installed")
+    demand = fetch_int4_records(
+        session,
+        "SELECT "
+        + pack_int4(
+            [
+                "s.item_id",
+                "s.store_id",
+                "ceil(f.reorder_point + f.daily_demand * %(review_days)s)::int"
+                " - s.quantity",
+            ],
+            "s.item_id, s.quantity / f.daily_demand, s.store_id",
+        )
+        + " FROM storeitemsbyid s JOIN forecast f USING (store_id, item_id) "
+        "WHERE s.quantity <= f.reorder_point AND f.daily_demand > 0",
+        {"review_days": settings.REPLENISHMENT_REVIEW_DAYS},
+        ["item_id", "store_id", "units"],
+    )
+    demand = demand[demand["units"] > 0]
+    supply = fetch_int4_records(
+        session,
+        "SELECT "
+        + pack_int4(
+            ["item_id", "warehouse_id", "quantity"],
+            "item_id, quantity DESC, warehouse_id",
+        )
+        + " FROM warehouseitemsbyid WHERE quantity > 0",
+        {},
+        ["item_id", "warehouse_id", "quantity"],
+    )
+    return allocate(
+        demand["item_id"],
+        demand["store_id"],
+        demand["units"],
+        supply["item_id"],
+        supply["warehouse_id"],
+        supply["quantity"],
+    )
+
+
+def plan(session: Session) -> ReplenishmentPlanPublic:
+    """
+    Plan the transfers refilling every store item at or below its reorder
+    point, from the current stock and the latest forecasts.
+    """
+    allocation = load_allocation(session)
+    planned = transfers(allocation)
+    return ReplenishmentPlanPublic.model_validate(
+        {
+            "transfers": planned,
+            "count": len(planned),
+            "units": int(allocation.quantities.sum()),
+            "unmet_units": allocation.unmet,
+        }
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--apply", action="store_true")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        allocation = load_allocation(session)
+        session.rollback()
+        planned = transfers(allocation)
+        for transfer in planned:
+            sys.stdout.write(json.dumps(transfer) + "\n")
+        logger.info(
+            "Planned %s transfers of %s units, %s units could not be covered",
+            len(planned),
+            int(allocation.quantities.sum()),
+            allocation.unmet,
+        )
+        if not args.apply:
+            return
+        applied = 0
+        for transfer in planned:
+            transfer_in = TransferCreate.model_validate(transfer)
+            # Stock may have moved since planning, skip what no longer fits
+            try:
+                crud.transfer_stock(session=session, transfer_in=transfer_in)
+                applied += 1
+            except crud.InsufficientStockError as e:
+                logger.warning(
+                    "Skipped transfer from warehouse %s to store %s: %s",
+                    transfer_in.warehouse_id,
+                    transfer_in.store_id,
+                    e,
+                )
+        logger.info("Applied %s of %s transfers", applied, len(planned))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Columnar snapshots of the inventory and purchase tables.
+
+Tables are read from a server-side cursor and written record batch by
+record batch, as Parquet (compressed, for storage and pandas/duckdb) or
+Arrow IPC files (uncompressed, memory-mappable without copies):
+
+    python -m app.snapshot --format parquet --output-dir snapshot/
+
+Needs pyarrow, installed with the `analytics` extra.
+"""
+import argparse
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Literal
+
+from sqlalchemy import Boolean, Connection, Date, DateTime, Float, Integer, select
+from sqlmodel import SQLModel
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import (
+    Item,
+    Purchase,
+    Store,
+    StoreItemsById,
+    Warehouse,
+    WarehouseItemsById,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+SnapshotFormat = Literal["parquet", "arrow"]
+
+SNAPSHOT_TABLES: dict[str, type[SQLModel]] = {
+    model.__tablename__: model  # type: ignore[misc]
+    for model in (
+        Item,
+        Warehouse,
+        Store,
+        WarehouseItemsById,
+        StoreItemsById,
+        Purchase,
+    )
+}
+
+MEDIA_TYPES: dict[SnapshotFormat, str] = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+class SnapshotUnavailableError(Exception):
+    """
+    Raised when pyarrow is not installed.
+    """
+
+
+def _arrow_type(column: Any) -> Any:
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(model: type[SQLModel]) -> Any:
+    """
+    Arrow schema matching the columns of `model`'s table.
+    """
+    if pa is None:
+        raise SnapshotUnavailableError("Snapshots need pyarrow")
+    return pa.schema(
+        [
+            pa.field(column.name, _arrow_type(column), nullable=column.nullable)
+            for column in model.__table__.columns  # type: ignore[attr-defined]
+        ]
+    )
+
+
+def record_batches(connection: Connection, model: type[SQLModel]) -> Iterator[Any]:
+    """
+    Yield the rows of `model`'s table, in id order, as Arrow record batches
+    of up to SNAPSHOT_BATCH_ROWS rows.
+    """
+    schema = arrow_schema(model)
+    table = model.__table__  # type: ignore[attr-defined]
+    result = connection.execution_options(
+        yield_per=settings.SNAPSHOT_BATCH_ROWS
+    ).execute(select(table).order_by(*table.primary_key.columns))
+    for partition in result.partitions():
+        columns = zip(*partition, strict=True)
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(values, type=field.type)
+                for values, field in zip(columns, schema, strict=True)
+            ],
+            schema=schema,
+        )
+
+
+class _ChunkSink:
+    """
+    Write-only file collecting what pyarrow writes until it is drained.
+    """
+
+    def __init__(self) -> None:
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(sink: Any, schema: Any, format: SnapshotFormat) -> Any:
+    if format == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    # Uncompressed so that readers can memory-map the columns as they are
+    return pa.ipc.new_file(sink, schema)
+
+
+def write_snapshot(
+    connection: Connection, model: type[SQLModel], format: SnapshotFormat, sink: Any
+) -> int:
+    """
+    Write the table of `model` to `sink`, returning the number of rows.
+    """
+    rows = 0
+    with _open_writer(sink, arrow_schema(model), format) as writer:
+        for batch in record_batches(connection, model):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def stream_snapshot(model: type[SQLModel], format: SnapshotFormat) -> Iterator[bytes]:
+    """
+    Yield a snapshot file of `model`'s table as it is being written.
+    """
+    sink = _ChunkSink()
+    with engine.connect() as connection:
+        with _open_writer(sink, arrow_schema(model), format) as writer:
+            for batch in record_batches(connection, model):
+                writer.write_batch(batch)
+                if data := sink.drain():
+                    yield data
+    yield sink.drain()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "tables", nargs="*", help=f"default: all of {', '.join(SNAPSHOT_TABLES)}"
+    )
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--output-dir", type=Path, default=Path("."))
+    args = parser.parse_args()
+    unknown = set(args.tables) - set(SNAPSHOT_TABLES)
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    # Every table of one snapshot is read as of the same instant
+    with engine.connect().execution_options(
+        isolation_level="REPEATABLE READ"
+    ) as connection:
+        for name in args.tables or SNAPSHOT_TABLES:
+            path = args.output_dir / f"{name}.{args.format}"
+            rows = write_snapshot(
+                connection, SNAPSHOT_TABLES[name], args.format, str(path)
+            )
+            logger.info("Wrote %s rows to %s", rows, path)
+
+
+if __name__ == "__main__":
+    main()
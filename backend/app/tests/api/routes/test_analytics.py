@@ -0,0 +1,217 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, col, delete
+
+from app import valuation
+from app.core.config import settings
+from app.models import Forecast, Purchase, StoreItemsById
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+from app.tests.utils.warehouse import create_random_warehouse
+
+
+def test_read_sales(client: TestClient, db: Session) -> None:
+    store = create_random_store(db)
+    first, second = create_random_item(db), create_random_item(db)
+    day_one = datetime(2024, 5, 1, 23, 30, tzinfo=timezone.utc)
+    day_two = datetime(2024, 5, 2, 8, 0, tzinfo=timezone.utc)
+    for item, quantity, date in (
+        (first, 2, day_one),
+        (first, 1, day_one),
+        (first, 3, day_two),
+        (second, 4, day_two),
+    ):
+        db.add(
+            Purchase(
+                store_id=store.id,
+                item_id=item.id,
+                item_name=item.name,
+                warehouse_price=1.0,
+                retail_price=2.5,
+                quantity=quantity,
+                date=date,
+            )
+        )
+    db.commit()
+
+    url = f"{settings.API_V1_STR}/analytics/sales"
+    params = {"group_by": "item,day", "store_id": store.id, "count": "exact"}
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 3
+    assert content["data"][0] == {
+        "store_id": None,
+        "item_id": first.id,
+        "day": "2024-05-01",
+        "units": 3,
+        "revenue": 7.5,
+        "cost": 3.0,
+        "margin": 4.5,
+    }
+
+    response = client.get(
+        url, params={"group_by": "item", "store_id": store.id, "from": "2024-05-02"}
+    )
+    assert [(row["item_id"], row["units"]) for row in response.json()["data"]] == [
+        (first.id, 3),
+        (second.id, 4),
+    ]
+
+    # count is the number of groups over all pages
+    params = {"group_by": "item,day", "store_id": store.id, "limit": 1}
+    content = client.get(url, params={**params, "count": "exact"}).json()
+    assert (len(content["data"]), content["count"]) == (1, 3)
+    response = client.get(url, params={"group_by": "store"})
+    assert response.status_code == 200
+    assert isinstance(response.json()["count"], int)
+    # Without grouping the totals are a single row, whatever the table holds
+    db.execute(text("ANALYZE salesdaily"))
+    db.commit()
+    response = client.get(url, params={"group_by": ""})
+    assert response.json()["count"] == 1
+
+    db.execute(delete(Purchase).where(col(Purchase.item_id) == second.id))
+    db.commit()
+    response = client.get(url, params={"group_by": "store", "store_id": store.id})
+    [row] = response.json()["data"]
+    assert row["units"] == 6
+    assert row["revenue"] == 15.0
+
+    response = client.get(url, params={"group_by": "week"})
+    assert response.status_code == 400
+
+
+def test_read_valuation(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    warehouse = create_random_warehouse(db)
+    store = create_random_store(db)
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/analytics/valuation"
+    params = {"location_type": "warehouse", "location_id": warehouse.id}
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {
+            "location_type": "warehouse",
+            "location_id": warehouse.id,
+            "units": 0,
+            "warehouse_value": 0.0,
+            "retail_value": 0.0,
+        }
+    ]
+
+    # Stock changes invalidate the cached valuation of their location
+    client.post(
+        f"{settings.API_V1_STR}/warehouseitems/",
+        json={
+            "warehouse_id": warehouse.id,
+            "item_id": item.id,
+            "item_name": item.name,
+            "warehouse_price": 2.0,
+            "retail_price": 5.0,
+            "quantity": 10,
+        },
+    )
+    [row] = client.get(url, params=params).json()["data"]
+    assert (row["units"], row["warehouse_value"], row["retail_value"]) == (
+        10,
+        20.0,
+        50.0,
+    )
+
+    response = client.post(
+        f"{settings.API_V1_STR}/transfers/",
+        headers=superuser_token_headers,
+        json={
+            "warehouse_id": warehouse.id,
+            "store_id": store.id,
+            "lines": [{"item_id": item.id, "quantity": 4}],
+        },
+    )
+    assert response.status_code == 200
+    [row] = client.get(url, params=params).json()["data"]
+    assert row["units"] == 6
+    response = client.get(url, params={"location_type": "store"})
+    [row] = [row for row in response.json()["data"] if row["location_id"] == store.id]
+    assert (row["units"], row["retail_value"]) == (4, 20.0)
+
+    response = client.get(url)
+    location_types = {row["location_type"] for row in response.json()["data"]}
+    assert location_types == {"warehouse", "store"}
+    assert client.get(url, params={"location_id": store.id}).status_code == 400
+
+
+def test_valuation_computed_before_invalidation_is_not_cached(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    warehouse = create_random_warehouse(db)
+    assert warehouse.id is not None
+    compute = valuation._compute
+
+    def compute_then_write(*args: Any) -> Any:
+        computed = compute(*args)
+        # A stock write committing while the valuation is computed
+        valuation._invalidate(f"warehouse:{warehouse.id}")
+        return computed
+
+    monkeypatch.setattr(valuation, "_compute", compute_then_write)
+    valuation.valuate(db, "warehouse", warehouse.id)
+    assert valuation.valuation_cache.get(("warehouse", warehouse.id)) is None
+
+    monkeypatch.setattr(valuation, "_compute", compute)
+    valuation.valuate(db, "warehouse", warehouse.id)
+    assert valuation.valuation_cache.get(("warehouse", warehouse.id)) is not None
+
+
+def test_read_forecasts(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    store = create_random_store(db)
+    low, high = create_random_item(db), create_random_item(db)
+    for item, quantity in ((low, 1), (high, 50)):
+        db.add(
+            StoreItemsById(
+                store_id=store.id,
+                item_id=item.id,
+                item_name=item.name,
+                warehouse_price=1.0,
+                retail_price=2.0,
+                quantity=quantity,
+            )
+        )
+        db.add(
+            Forecast(
+                store_id=store.id,
+                item_id=item.id,
+                daily_demand=1.0,
+                demand_stddev=0.5,
+                reorder_point=9.0,
+                computed_at=datetime.now(timezone.utc),
+            )
+        )
+    db.commit()
+
+    url = f"{settings.API_V1_STR}/analytics/forecasts"
+    response = client.get(url, params={"store_id": store.id})
+    assert response.status_code == 200
+    assert [row["on_hand"] for row in response.json()["data"]] == [1, 50]
+    response = client.get(url, params={"store_id": store.id, "limit": 1})
+    content = response.json()
+    assert (len(content["data"]), content["count"]) == (1, 2)
+    response = client.get(
+        url, params={"store_id": store.id, "below_reorder_point": True}
+    )
+    [row] = response.json()["data"]
+    assert (row["item_id"], row["reorder_point"]) == (low.id, 9.0)
+
+    response = client.post(f"{url}/recompute")
+    assert response.status_code == 401
+    response = client.post(f"{url}/recompute", headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.json()["count"] >= 2
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models import Item, WarehouseItemsById
+from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import random_lower_string
+from app.tests.utils.warehouse import create_random_warehouse
+
+
+def test_import_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    name = random_lower_string()
+    content = (
+        "name,warehouse_price,retail_price\n"
+        f"{name},1.5,2.5\n"
+        f'"{name}, large",3,4.5\n'
+        f"{name},not a price,1\n"
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/imports/item",
+        headers=superuser_token_headers,
+        files={"file": ("items.csv", content, "text/csv")},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["count"] == 2
+    assert report["rejected"] == 1
+    assert report["errors"][0]["index"] == 2
+    assert report["errors"][0]["detail"].startswith("warehouse_price")
+
+    items = db.exec(select(Item).where(col(Item.name).startswith(name))).all()
+    assert sorted(item.retail_price for item in items) == [2.5, 4.5]
+
+
+def test_import_warehouse_stock(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    warehouse = create_random_warehouse(db)
+    item = create_random_item(db)
+    header = "warehouse_id,item_id,item_name,warehouse_price,retail_price,quantity\n"
+    row = f"{warehouse.id},{item.id},{item.name},1,2"
+    content = f"{header}{row},3\n{row},4\n{warehouse.id},0,missing,1,2,1\n"
+    for _ in range(2):
+        response = client.post(
+            f"{settings.API_V1_STR}/imports/warehouseitemsbyid",
+            headers=superuser_token_headers,
+            files={"file": ("stock.csv", content, "text/csv")},
+        )
+        assert response.status_code == 200
+        report = response.json()
+        assert report["count"] == 2
+        assert report["errors"] == [{"index": 2, "detail": "Unknown location or item"}]
+
+    stock = db.exec(
+        select(WarehouseItemsById).where(
+            WarehouseItemsById.warehouse_id == warehouse.id
+        )
+    ).one()
+    assert stock.quantity == 14
+
+
+def test_import_unknown_table(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/imports/user",
+        headers=superuser_token_headers,
+        files={"file": ("users.csv", "email\n", "text/csv")},
+    )
+    assert response.status_code == 404
@@ -1,8 +1,16 @@
+from typing import Any
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 from sqlmodel import Session
 
+from app.api.deps import get_item_cached, item_cache
 from app.core.config import settings
+from app.core.db import async_engine
+from app.models import Item
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import random_lower_string, record_statements
 
 
 def test_create_item(
@@ -160,3 +168,206 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_create_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = [
+        {"name": "Foo", "warehouse_price": 1.5, "retail_price": 2.5},
+        {"name": "Bar", "warehouse_price": "not a price", "retail_price": 3},
+        {"name": "Baz", "warehouse_price": 4, "retail_price": 6},
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    assert [item["name"] for item in content["data"]] == ["Foo", "Baz"]
+    assert all("id" in item for item in content["data"])
+    assert len(content["errors"]) == 1
+    assert content["errors"][0]["index"] == 1
+    assert "warehouse_price" in content["errors"][0]["detail"]
+    assert content["rows_per_second"] >= 0
+
+
+def test_create_items_bulk_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    lines = [
+        '{"name": "Foo", "warehouse_price": 1, "retail_price": 2}',
+        "",
+        '{"name": "Bar", "warehouse_price": 3, "retail_price": 4}',
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers={**superuser_token_headers, "Content-Type": "application/x-ndjson"},
+        content="\n".join(lines),
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    assert content["errors"] == []
+
+
+def test_create_items_bulk_invalid_body(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json={"name": "Foo"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Expected a JSON array"
+
+
+def test_read_item_cached(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    client.get(url, headers=superuser_token_headers)
+    with record_statements(async_engine.sync_engine) as statements:
+        response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == item.name
+    assert statements == []
+
+
+def test_update_and_delete_item_invalidate_cache(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    client.get(url, headers=superuser_token_headers)
+
+    response = client.put(url, headers=superuser_token_headers, json={"name": "Foo"})
+    assert response.status_code == 200
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.json()["name"] == "Foo"
+
+    response = client.delete(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 404
+
+
+def test_item_loaded_before_invalidation_is_not_cached(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    item = create_random_item(db)
+    item_id = item.id
+    assert item_id is not None
+    get = db.get
+
+    def get_then_write(*args: Any, **kwargs: Any) -> Any:
+        loaded = get(*args, **kwargs)
+        # An update committing while the item is loaded
+        item_cache.pop(item_id)
+        return loaded
+
+    monkeypatch.setattr(db, "get", get_then_write)
+    assert get_item_cached(db, item_id) is item
+    assert item_cache.get(item_id) is None
+
+    monkeypatch.setattr(db, "get", get)
+    get_item_cached(db, item_id)
+    assert item_cache.get(item_id) is not None
+
+
+def test_read_items_conditional_get(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    count = response.json()["count"]
+
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    response = client.get(url, headers=headers, params={"limit": 1})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    # The new ETag comes with the new count, not a cached one
+    create_random_item(db)
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["count"] == count + 1
+
+
+def test_search_items_prefix(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    prefix = random_lower_string()[:12]
+    ids = []
+    for suffix in ["b", "A", "c"]:
+        response = client.post(
+            url,
+            headers=superuser_token_headers,
+            json={"name": prefix + suffix, "warehouse_price": 1, "retail_price": 2},
+        )
+        ids.append(response.json()["id"])
+
+    search_url = f"{settings.API_V1_STR}/items/search"
+    params: dict[str, Any] = {"q": prefix.upper(), "mode": "prefix", "limit": 2}
+    response = client.get(search_url, headers=superuser_token_headers, params=params)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    assert [row["name"] for row in content["data"]] == [prefix + "A", prefix + "b"]
+
+    # Renamed and deleted items are reflected on the next search
+    client.put(
+        f"{url}{ids[2]}", headers=superuser_token_headers, json={"name": "zz" + prefix}
+    )
+    client.delete(f"{url}{ids[1]}", headers=superuser_token_headers)
+    params["limit"] = 10
+    response = client.get(search_url, headers=superuser_token_headers, params=params)
+    assert response.json()["data"] == [{"id": ids[0], "name": prefix + "b"}]
+
+
+def test_search_items_prefix_sees_other_workers(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    search_url = f"{settings.API_V1_STR}/items/search"
+    prefix = random_lower_string()[:12]
+    params = {"q": prefix, "mode": "prefix"}
+    response = client.get(search_url, headers=superuser_token_headers, params=params)
+    assert response.json()["count"] == 0
+
+    # Written without publishing an invalidation, as by another worker
+    item = Item(name=prefix + "x", warehouse_price=1, retail_price=2)
+    db.add(item)
+    db.commit()
+    response = client.get(search_url, headers=superuser_token_headers, params=params)
+    assert response.json()["data"] == [{"id": item.id, "name": item.name}]
+
+
+def test_search_items_fuzzy(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    installed = text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if not db.execute(installed).first():
+        pytest.skip("pg_trgm is not installed")
+    item = create_random_item(db)
+    # One typo in the last word of the name
+    query = item.name[:-1] + ("a" if item.name[-1] != "a" else "b")
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=superuser_token_headers,
+        params={"q": query},
+    )
+    assert response.status_code == 200
+    assert {"id": item.id, "name": item.name} in response.json()["data"]
@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.api import pagination
+from app.core.config import settings
+from app.models import Purchase, StoreItemsById, StoreItemsByIdCreate
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+
+
+def test_ingest_purchases(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    store = create_random_store(db)
+    stocked, unstocked = create_random_item(db), create_random_item(db)
+    row_in = StoreItemsByIdCreate(
+        store_id=store.id,
+        item_id=stocked.id,
+        item_name=stocked.name,
+        warehouse_price=stocked.warehouse_price,
+        retail_price=stocked.retail_price,
+        quantity=5,
+    )
+    crud.upsert_stock(session=db, model=StoreItemsById, rows_in=[row_in])
+    date = "2024-05-01T10:00:00"
+    data = {
+        "lines": [
+            {"store_id": store.id, "item_id": stocked.id, "quantity": 2, "date": date},
+            {
+                "store_id": store.id,
+                "item_id": unstocked.id,
+                "quantity": 1,
+                "date": date,
+            },
+            {"store_id": store.id, "item_id": stocked.id, "quantity": 2, "date": date},
+        ]
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/purchases/batch",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    assert [purchase["quantity"] for purchase in content["data"]] == [2, 2]
+    assert content["data"][0]["retail_price"] == stocked.retail_price
+    assert content["errors"] == [{"index": 1, "detail": "Out of stock"}]
+
+    store_item = db.exec(
+        select(StoreItemsById).where(StoreItemsById.store_id == store.id)
+    ).one()
+    db.refresh(store_item)
+    assert store_item.quantity == 1
+
+    response = client.post(
+        f"{settings.API_V1_STR}/purchases/batch",
+        headers=superuser_token_headers,
+        json={"lines": data["lines"][:1]},
+    )
+    content = response.json()
+    assert content["count"] == 0
+    assert content["errors"] == [{"index": 0, "detail": "Out of stock"}]
+
+
+def test_ingest_purchases_same_stock_row(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    row_in = StoreItemsByIdCreate(
+        store_id=store.id,
+        item_id=item.id,
+        item_name=item.name,
+        warehouse_price=item.warehouse_price,
+        retail_price=item.retail_price,
+        quantity=10,
+    )
+    crud.upsert_stock(session=db, model=StoreItemsById, rows_in=[row_in])
+    # Lines are accepted in order while the stock lasts
+    lines = [
+        {
+            "store_id": store.id,
+            "item_id": item.id,
+            "quantity": quantity,
+            "date": f"2024-05-0{day}T10:00:00",
+        }
+        for day, quantity in enumerate([2, 2, 2, 5, 1], start=1)
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/purchases/batch",
+        headers=superuser_token_headers,
+        json={"lines": lines},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 3
+    assert [purchase["date"][:10] for purchase in content["data"]] == [
+        "2024-05-01",
+        "2024-05-02",
+        "2024-05-03",
+    ]
+    assert content["errors"] == [
+        {"index": 3, "detail": "Out of stock"},
+        {"index": 4, "detail": "Out of stock"},
+    ]
+
+    store_item = db.exec(
+        select(StoreItemsById).where(StoreItemsById.store_id == store.id)
+    ).one()
+    db.refresh(store_item)
+    assert store_item.quantity == 4
+
+
+def test_export_purchases(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    purchases = [
+        Purchase(
+            store_id=store.id,
+            item_id=item.id,
+            item_name=item.name,
+            warehouse_price=item.warehouse_price,
+            retail_price=item.retail_price,
+            quantity=quantity,
+            date=datetime(2024, 5, quantity, 10, tzinfo=timezone.utc),
+        )
+        for quantity in (1, 2, 3)
+    ]
+    db.add_all(purchases)
+    db.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/purchases/export",
+        headers=superuser_token_headers,
+        params={"store_id": store.id, "from": "2024-05-02", "to": "2024-05-04"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["quantity"] for row in rows] == [2, 3]
+    assert rows[0]["item_name"] == item.name
+
+    response = client.get(
+        f"{settings.API_V1_STR}/purchases/export",
+        headers=superuser_token_headers,
+        params={"store_id": store.id, "format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *lines = list(csv.reader(io.StringIO(response.text)))
+    assert header[0] == "store_id"
+    assert len(lines) == 3
+    assert lines[0][header.index("quantity")] == "1"
+
+
+def test_read_purchases_date_range(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    db.add_all(
+        Purchase(
+            store_id=store.id,
+            item_id=item.id,
+            item_name=item.name,
+            warehouse_price=item.warehouse_price,
+            retail_price=item.retail_price,
+            quantity=day,
+            date=datetime(2023, 1, day, 23, tzinfo=timezone.utc),
+        )
+        for day in (1, 2, 3)
+    )
+    db.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        headers=superuser_token_headers,
+        params={"from": "2023-01-02T00:00:00Z", "to": "2023-01-03T23:00:00+00:00"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 1
+    [purchase] = content["data"]
+    assert purchase["quantity"] == 2
+    assert purchase["date"].startswith("2023-01-02T23:00:00")
+
+
+def test_read_purchases_estimated_count(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    db.add(
+        Purchase(
+            store_id=store.id,
+            item_id=item.id,
+            item_name=item.name,
+            warehouse_price=item.warehouse_price,
+            retail_price=item.retail_price,
+            quantity=1,
+            date=datetime(2024, 5, 1, 10, tzinfo=timezone.utc),
+        )
+    )
+    db.commit()
+    # Autovacuum analyzes the partitions, never the partitioned table
+    leaves = db.execute(
+        text(
+            "SELECT relid::regclass::text FROM pg_partition_tree('purchase') "
+            "WHERE isleaf"
+        )
+    ).scalars()
+    for leaf in leaves.all():
+        db.execute(text(f"ANALYZE {leaf}"))
+    db.commit()
+    exact = db.exec(select(func.count()).select_from(Purchase)).one()
+
+    # Read from the statistics of the partitions, not counted
+    def exact_count(*_: Any) -> int:
+        raise AssertionError("counted exactly")
+
+    monkeypatch.setattr(pagination, "_exact_count", exact_count)
+    response = client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        headers=superuser_token_headers,
+        params={"count": "estimated", "limit": 1},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == exact
@@ -0,0 +1,71 @@
+import io
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import WarehouseItemsById, WarehouseItemsByIdCreate
+from app.tests.utils.item import create_random_item
+from app.tests.utils.warehouse import create_random_warehouse
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export_snapshot(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    format: str,
+) -> None:
+    warehouse = create_random_warehouse(db)
+    item = create_random_item(db)
+    row_in = WarehouseItemsByIdCreate(
+        warehouse_id=warehouse.id,
+        item_id=item.id,
+        item_name=item.name,
+        warehouse_price=item.warehouse_price,
+        retail_price=item.retail_price,
+        quantity=7,
+    )
+    crud.upsert_stock(session=db, model=WarehouseItemsById, rows_in=[row_in])
+
+    with patch("app.core.config.settings.SNAPSHOT_BATCH_ROWS", 1):
+        response = client.get(
+            f"{settings.API_V1_STR}/snapshots/warehouseitemsbyid",
+            headers=superuser_token_headers,
+            params={"format": format},
+        )
+    assert response.status_code == 200
+    source = io.BytesIO(response.content)
+    if format == "parquet":
+        table = pq.read_table(source)
+    else:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.schema.field("quantity").type == pa.int64()
+    rows = table.to_pylist()
+    assert {"warehouse_id": warehouse.id, "quantity": 7}.items() <= next(
+        row for row in rows if row["item_id"] == item.id
+    ).items()
+
+
+def test_export_snapshot_unknown_table(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/snapshots/user", headers=superuser_token_headers
+    )
+    assert response.status_code == 404
+
+
+def test_export_snapshot_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/snapshots/item", headers=normal_user_token_headers
+    )
+    assert response.status_code == 403
@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+
+
+def test_add_item_to_store(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    data = {
+        "store_id": store.id,
+        "item_id": item.id,
+        "item_name": item.name,
+        "warehouse_price": item.warehouse_price,
+        "retail_price": item.retail_price,
+        "quantity": 2,
+    }
+    for quantity in (2, 4):
+        response = client.post(
+            f"{settings.API_V1_STR}/storeitems/",
+            headers=superuser_token_headers,
+            json=data,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        assert content["store_id"] == store.id
+        assert content["item_id"] == item.id
+        assert content["quantity"] == quantity
+
+
+def test_add_item_to_unknown_store(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    data = {
+        "store_id": 999999,
+        "item_id": item.id,
+        "item_name": item.name,
+        "warehouse_price": item.warehouse_price,
+        "retail_price": item.retail_price,
+        "quantity": 1,
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/storeitems/",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Store or item not found"
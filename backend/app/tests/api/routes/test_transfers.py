@@ -0,0 +1,198 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import (
+    Forecast,
+    Item,
+    StoreItemsById,
+    StoreItemsByIdCreate,
+    TransferCreate,
+    TransferLine,
+    Warehouse,
+    WarehouseItemsById,
+    WarehouseItemsByIdCreate,
+)
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+from app.tests.utils.warehouse import create_random_warehouse
+
+
+def stock_warehouse(
+    db: Session, warehouse: Warehouse, items: list[Item], quantity: int
+) -> None:
+    rows_in = [
+        WarehouseItemsByIdCreate(
+            warehouse_id=warehouse.id,
+            item_id=item.id,
+            item_name=item.name,
+            warehouse_price=item.warehouse_price,
+            retail_price=item.retail_price,
+            quantity=quantity,
+        )
+        for item in items
+    ]
+    crud.upsert_stock(session=db, model=WarehouseItemsById, rows_in=rows_in)
+
+
+def test_create_transfer(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    warehouse = create_random_warehouse(db)
+    store = create_random_store(db)
+    items = [create_random_item(db), create_random_item(db)]
+    stock_warehouse(db, warehouse, items, 10)
+    data = {
+        "warehouse_id": warehouse.id,
+        "store_id": store.id,
+        "lines": [
+            {"item_id": items[0].id, "quantity": 4},
+            {"item_id": items[1].id, "quantity": 10},
+        ],
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/transfers/",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    warehouse_quantities = {
+        row["item_id"]: row["quantity"] for row in content["warehouse_items"]
+    }
+    store_quantities = {
+        row["item_id"]: row["quantity"] for row in content["store_items"]
+    }
+    assert warehouse_quantities == {items[0].id: 6, items[1].id: 0}
+    assert store_quantities == {items[0].id: 4, items[1].id: 10}
+    assert all(row["store_id"] == store.id for row in content["store_items"])
+
+
+def test_create_transfer_insufficient_stock(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    warehouse = create_random_warehouse(db)
+    store = create_random_store(db)
+    items = [create_random_item(db), create_random_item(db)]
+    stock_warehouse(db, warehouse, items[:1], 10)
+    data = {
+        "warehouse_id": warehouse.id,
+        "store_id": store.id,
+        "lines": [
+            {"item_id": items[0].id, "quantity": 1},
+            {"item_id": items[1].id, "quantity": 1},
+        ],
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/transfers/",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 409
+    assert str(items[1].id) in response.json()["detail"]
+    warehouse_item = db.exec(
+        select(WarehouseItemsById).where(
+            WarehouseItemsById.warehouse_id == warehouse.id
+        )
+    ).one()
+    db.refresh(warehouse_item)
+    assert warehouse_item.quantity == 10
+
+
+def test_concurrent_transfers_conserve_stock(db: Session) -> None:
+    warehouse = create_random_warehouse(db)
+    store = create_random_store(db)
+    items = [create_random_item(db) for _ in range(4)]
+    stock_warehouse(db, warehouse, items, 1000)
+    assert warehouse.id and store.id
+
+    def transfer(reverse: bool) -> None:
+        # Lines in opposite orders would deadlock without ordered locking
+        ordered = list(reversed(items)) if reverse else items
+        transfer_in = TransferCreate(
+            warehouse_id=warehouse.id,
+            store_id=store.id,
+            lines=[TransferLine(item_id=item.id, quantity=1) for item in ordered],
+        )
+        for _ in range(5):
+            with Session(engine) as session:
+                crud.transfer_stock(session=session, transfer_in=transfer_in)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        futures = [executor.submit(transfer, i % 2 == 0) for i in range(16)]
+        for future in futures:
+            future.result()
+
+    with Session(engine) as session:
+        store_items = session.exec(
+            select(StoreItemsById).where(StoreItemsById.store_id == store.id)
+        ).all()
+        warehouse_items = session.exec(
+            select(WarehouseItemsById).where(
+                WarehouseItemsById.warehouse_id == warehouse.id
+            )
+        ).all()
+    assert {row.quantity for row in store_items} == {80}
+    assert {row.quantity for row in warehouse_items} == {920}
+
+
+def test_plan_transfers(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pytest.importorskip("numpy")
+    warehouse = create_random_warehouse(db)
+    item = create_random_item(db)
+    stock_warehouse(db, warehouse, [item], 10)
+    stores = [create_random_store(db), create_random_store(db)]
+    # One day of cover left in the first store, three in the second
+    for store, quantity in zip(stores, (1, 3), strict=True):
+        crud.upsert_stock(
+            session=db,
+            model=StoreItemsById,
+            rows_in=[
+                StoreItemsByIdCreate(
+                    store_id=store.id,
+                    item_id=item.id,
+                    item_name=item.name,
+                    warehouse_price=item.warehouse_price,
+                    retail_price=item.retail_price,
+                    quantity=quantity,
+                )
+            ],
+        )
+        db.add(
+            Forecast(
+                store_id=store.id,
+                item_id=item.id,
+                daily_demand=1.0,
+                demand_stddev=0.0,
+                reorder_point=9.0,
+                computed_at=datetime.now(timezone.utc),
+            )
+        )
+    db.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/transfers/plan", headers=superuser_token_headers
+    )
+    assert response.status_code == 200
+    planned = [
+        transfer
+        for transfer in response.json()["transfers"]
+        if transfer["warehouse_id"] == warehouse.id
+    ]
+    # Up to 16 units wanted by each, all 10 go to the most urgent
+    assert planned == [
+        {
+            "warehouse_id": warehouse.id,
+            "store_id": stores[0].id,
+            "lines": [{"item_id": item.id, "quantity": 10}],
+        }
+    ]
+    assert response.json()["unmet_units"] >= 18
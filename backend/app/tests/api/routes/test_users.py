@@ -1,13 +1,23 @@
+from typing import Any
 from unittest.mock import patch
 
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, select
+from sqlalchemy import text
+from sqlmodel import Session, func, select
 
 from app import crud
+from app.api import pagination
 from app.core.config import settings
+from app.core.db import engine
 from app.core.security import verify_password
 from app.models import User, UserCreate
-from app.tests.utils.utils import random_email, random_lower_string
+from app.tests.utils.user import user_authentication_headers
+from app.tests.utils.utils import (
+    random_email,
+    random_lower_string,
+    record_statements,
+)
 
 
 def test_get_users_superuser_me(
@@ -167,6 +177,84 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_retrieve_users_with_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        user_in = UserCreate(email=random_email(), password=random_lower_string())
+        crud.create_user(session=db, user_create=user_in)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 2},
+    )
+    first_page = r.json()
+    assert len(first_page["data"]) == 2
+    assert first_page["next_cursor"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 2, "after": first_page["next_cursor"]},
+    )
+    second_page = r.json()
+    assert second_page["data"]
+    last_id = first_page["data"][-1]["id"]
+    assert all(user["id"] > last_id for user in second_page["data"])
+
+
+def test_retrieve_users_count_modes(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"count": "none"},
+    )
+    assert r.status_code == 200
+    assert r.json()["count"] is None
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"count": "estimated"},
+    )
+    assert r.status_code == 200
+    assert isinstance(r.json()["count"], int)
+
+    db.execute(text('ANALYZE "user"'))
+    db.commit()
+    exact = db.exec(select(func.count()).select_from(User)).one()
+
+    # Read from the statistics of the table, not counted
+    def exact_count(*_: Any) -> int:
+        raise AssertionError("counted exactly")
+
+    monkeypatch.setattr(pagination, "_exact_count", exact_count)
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"count": "estimated"},
+    )
+    assert r.json()["count"] == exact
+
+
+def test_retrieve_users_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"after": "not-a-cursor"},
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -366,6 +454,61 @@ def test_update_user(
     assert user_db.full_name == "Updated_full_name"
 
 
+def test_update_user_password(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    url = f"{settings.API_V1_STR}/users/{user.id}"
+    data = {"password": random_lower_string()}
+
+    # The new password is hashed on the process pool
+    with patch("app.core.config.settings.PASSWORD_HASH_MAX_PENDING", 0):
+        r = client.patch(url, headers=superuser_token_headers, json=data)
+    assert r.status_code == 503
+
+    r = client.patch(url, headers=superuser_token_headers, json=data)
+    assert r.status_code == 200
+    db.refresh(user)
+    assert verify_password(data["password"], user.hashed_password)
+
+
+def test_current_user_is_cached(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    with record_statements(engine) as statements:
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+        )
+    assert r.status_code == 200
+    assert statements == []
+
+
+def test_update_user_invalidates_cached_user(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
 def test_update_user_not_exists(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -0,0 +1,160 @@
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.tests.utils.item import create_random_item
+from app.tests.utils.warehouse import create_random_warehouse
+
+
+def test_add_items_to_warehouse_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    warehouse = create_random_warehouse(db)
+    items = [create_random_item(db), create_random_item(db)]
+    manifest = [
+        {
+            "warehouse_id": warehouse.id,
+            "item_id": item.id,
+            "item_name": item.name,
+            "warehouse_price": item.warehouse_price,
+            "retail_price": item.retail_price,
+            "quantity": quantity,
+        }
+        for item, quantity in [(items[0], 3), (items[1], 4), (items[0], 5)]
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/warehouseitems/bulk",
+        headers=superuser_token_headers,
+        json=manifest,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    quantities = {row["item_id"]: row["quantity"] for row in content["data"]}
+    assert quantities == {items[0].id: 8, items[1].id: 4}
+
+    response = client.post(
+        f"{settings.API_V1_STR}/warehouseitems/bulk",
+        headers=superuser_token_headers,
+        json=manifest[:1],
+    )
+    assert response.json()["data"][0]["quantity"] == 11
+
+
+def test_add_items_to_warehouse_bulk_unknown_warehouse(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    manifest = [
+        {
+            "warehouse_id": 999999,
+            "item_id": item.id,
+            "item_name": item.name,
+            "warehouse_price": item.warehouse_price,
+            "retail_price": item.retail_price,
+            "quantity": 1,
+        }
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/warehouseitems/bulk",
+        headers=superuser_token_headers,
+        json=manifest,
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown warehouse or item in manifest"
+
+
+def test_add_item_to_unknown_warehouse(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    data = {
+        "warehouse_id": 999999,
+        "item_id": item.id,
+        "item_name": item.name,
+        "warehouse_price": item.warehouse_price,
+        "retail_price": item.retail_price,
+        "quantity": 1,
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/warehouseitems/",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Warehouse or item not found"
+
+
+def test_read_warehouse_items_by_id_filtered_and_sorted(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    warehouse = create_random_warehouse(db)
+    items = [create_random_item(db) for _ in range(4)]
+    manifest = [
+        {
+            "warehouse_id": warehouse.id,
+            "item_id": item.id,
+            "item_name": item.name,
+            "warehouse_price": 1.0,
+            "retail_price": retail_price,
+            "quantity": quantity,
+        }
+        for item, quantity, retail_price in zip(
+            items, [5, 1, 9, 3], [2.5, 4.0, 1.5, 4.0], strict=True
+        )
+    ]
+    client.post(
+        f"{settings.API_V1_STR}/warehouseitems/bulk",
+        headers=superuser_token_headers,
+        json=manifest,
+    )
+    url = f"{settings.API_V1_STR}/warehouseitems/{warehouse.id}"
+
+    response = client.get(
+        url, headers=superuser_token_headers, params={"quantity_below": 5}
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    assert [row["item_id"] for row in content["data"]] == [items[1].id, items[3].id]
+
+    response = client.get(
+        url,
+        headers=superuser_token_headers,
+        params={"item_id": [items[0].id, items[2].id], "sort": "-quantity"},
+    )
+    assert [row["item_id"] for row in response.json()["data"]] == [
+        items[2].id,
+        items[0].id,
+    ]
+
+    # Keyset pages follow the sort order, ties broken by id in the same order
+    params: dict[str, Any] = {"sort": "-retail_price", "limit": 2}
+    response = client.get(url, headers=superuser_token_headers, params=params)
+    content = response.json()
+    assert [row["item_id"] for row in content["data"]] == [items[3].id, items[1].id]
+    params["after"] = content["next_cursor"]
+    response = client.get(url, headers=superuser_token_headers, params=params)
+    content = response.json()
+    assert [row["item_id"] for row in content["data"]] == [items[0].id, items[2].id]
+    assert content["next_cursor"] is None
+
+    response = client.get(
+        url, headers=superuser_token_headers, params={**params, "sort": "quantity"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+    response = client.get(
+        url, headers=superuser_token_headers, params={"sort": "warehouse_price"}
+    )
+    assert response.status_code == 400
+    assert (
+        response.json()["detail"] == "Cannot sort by warehouse_price, it is not indexed"
+    )
+
+    response = client.get(url, headers=superuser_token_headers, params={"sort": "foo"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cannot sort by foo"
@@ -0,0 +1,106 @@
+"""
+Requests/sec and latency percentiles of one list endpoint under concurrency.
+
+Serves the same GET /items/ route twice in process, once as a threadpool
+route on the sync engine and once as an async route on the async engine,
+and drives both with the same query and concurrency, so the only
+difference measured is the engine the route runs on:
+
+    python -m app.tests.benchmarks.bench_async_routes --clients 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from sqlmodel import select
+
+from app.api.deps import AsyncSessionDep, SessionDep
+from app.api.pagination import paginate
+from app.models import Item, ItemsPublic
+
+PATH = "/items/"
+PARAMS = {"limit": 20}
+
+
+def sync_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get(PATH, response_model=ItemsPublic)
+    def read_items(session: SessionDep, limit: int = 100) -> Any:
+        items, next_cursor = paginate(
+            session, select(Item), Item, skip=0, limit=limit, after=None
+        )
+        return ItemsPublic(data=items, count=None, next_cursor=next_cursor)
+
+    return app
+
+
+def async_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get(PATH, response_model=ItemsPublic)
+    async def read_items(session: AsyncSessionDep, limit: int = 100) -> Any:
+        items, next_cursor = await session.run_sync(
+            paginate, select(Item), Item, skip=0, limit=limit, after=None
+        )
+        return ItemsPublic(data=items, count=None, next_cursor=next_cursor)
+
+    return app
+
+
+ENGINES = {"sync": sync_app, "async": async_app}
+
+
+async def client_loop(
+    client: httpx.AsyncClient, deadline: float, latencies: list[float]
+) -> int:
+    errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(PATH, params=PARAMS)
+            if response.status_code != 200:
+                errors += 1
+        except httpx.HTTPError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    return errors
+
+
+async def run(app: FastAPI, clients: int, duration: float) -> None:
+    latencies: list[float] = []
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+    ) as client:
+        deadline = time.perf_counter() + duration
+        errors = sum(
+            await asyncio.gather(
+                *(client_loop(client, deadline, latencies) for _ in range(clients))
+            )
+        )
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"  {len(latencies) / duration:8.1f} req/s  p50 {p50:7.1f} ms  "
+        f"p99 {p99:7.1f} ms  errors {errors}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+
+    for name, make_app in ENGINES.items():
+        print(f"{name} engine, GET {PATH} with {args.clients} concurrent clients:")
+        asyncio.run(run(make_app(), args.clients, args.duration))
+
+
+if __name__ == "__main__":
+    main()
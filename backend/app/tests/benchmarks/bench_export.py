@@ -0,0 +1,81 @@
+"""
+Throughput and peak memory of the purchase export.
+
+Seeds purchases for a scratch store and item, streams them through the
+export encoder exactly as GET /purchases/export does, then deletes them
+again. Peak RSS should not move with --rows:
+
+    python -m app.tests.benchmarks.bench_export --rows 10000000 --format csv
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session, col, delete, select
+
+from app.api.export import ExportFormat, _stream_export
+from app.core.db import engine
+from app.models import Item, Purchase, Store
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def export(store_id: int, format: ExportFormat) -> int:
+    statement = (
+        select(*Purchase.__table__.c)  # type: ignore[attr-defined]
+        .where(col(Purchase.store_id) == store_id)
+        .order_by(col(Purchase.id))
+    )
+    size = 0
+    async for chunk in _stream_export(statement, format):
+        size += len(chunk)
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        store = Store(name="bench export", location="bench")
+        item = Item(name="bench export", warehouse_price=1, retail_price=2)
+        session.add_all([store, item])
+        session.commit()
+        try:
+            session.execute(
+                text(
+                    "INSERT INTO purchase (store_id, item_id, item_name, "
+                    "warehouse_price, retail_price, quantity, date) "
+                    "SELECT :store, :item, 'bench export', 1, 2, n % 10 + 1, "
+                    "'2024-01-01T00:00:00' FROM generate_series(1, :rows) AS n"
+                ),
+                {"store": store.id, "item": item.id, "rows": args.rows},
+            )
+            session.commit()
+
+            rss_before = max_rss_mb()
+            started = time.perf_counter()
+            size = asyncio.run(export(store.id, args.format))  # type: ignore[arg-type]
+            elapsed = time.perf_counter() - started
+            print(
+                f"{args.rows} rows, {size / 2**20:.1f} MiB of {args.format} "
+                f"in {elapsed:.1f} s: {args.rows / elapsed:,.0f} rows/s, "
+                f"{size / 2**20 / elapsed:.1f} MiB/s"
+            )
+            print(f"peak RSS {rss_before:.0f} MiB before, {max_rss_mb():.0f} MiB after")
+        finally:
+            session.rollback()
+            session.execute(delete(Purchase).where(col(Purchase.store_id) == store.id))
+            session.delete(store)
+            session.delete(item)
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
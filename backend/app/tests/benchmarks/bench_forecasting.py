@@ -0,0 +1,126 @@
+"""
+Time of a full forecasting run on a synthetic network.
+
+Forecasts random histories of --stores x --items series in memory, batch
+by batch as a run does, to time the NumPy part alone. With --database,
+also seeds scratch stores and items, stocks every item in every store,
+fills the sales rollup for about --density of the days of history, runs
+the same recompute as `python -m app.forecasting`, then deletes it all
+again:
+
+    python -m app.tests.benchmarks.bench_forecasting --stores 500 --items 10000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.forecasting import forecast_demand, recompute, reorder_points
+
+SEED = [
+    "INSERT INTO store (name, location) "
+    "SELECT 'bench forecast', 'bench' FROM generate_series(1, :stores)",
+    "INSERT INTO item (name, warehouse_price, retail_price) "
+    "SELECT 'bench forecast', 1, 2 FROM generate_series(1, :items)",
+    "INSERT INTO storeitemsbyid "
+    "(store_id, item_id, item_name, warehouse_price, retail_price, quantity) "
+    "SELECT s.id, i.id, i.name, 1, 2, 10 FROM store s, item i "
+    "WHERE s.name = 'bench forecast' AND i.name = 'bench forecast'",
+    "INSERT INTO salesdaily (store_id, item_id, day, units, revenue, cost) "
+    "SELECT store_id, item_id, day, 1 + (random() * 5)::int, 0, 0 "
+    "FROM storeitemsbyid s, generate_series(:start, :end, interval '1 day') day "
+    "WHERE s.item_name = 'bench forecast' AND random() < :density",
+]
+
+CLEANUP = [
+    "DELETE FROM salesdaily WHERE store_id IN "
+    "(SELECT id FROM store WHERE name = 'bench forecast')",
+    "DELETE FROM storeitemsbyid WHERE item_name = 'bench forecast'",
+    "DELETE FROM forecast",
+    "DELETE FROM store WHERE name = 'bench forecast'",
+    "DELETE FROM item WHERE name = 'bench forecast'",
+]
+
+
+def compute(series: int, density: float, method: str) -> float:
+    rng = np.random.default_rng(0)
+    days = settings.FORECAST_HISTORY_DAYS
+    elapsed = 0.0
+    for start in range(0, series, settings.FORECAST_BATCH_SERIES):
+        size = min(settings.FORECAST_BATCH_SERIES, series - start)
+        units = rng.poisson(3, (size, days)) * (rng.random((size, days)) < density)
+        units = units.astype(np.float64)
+        started = time.perf_counter()
+        demand = forecast_demand(
+            units,
+            method,  # type: ignore[arg-type]
+            window=settings.FORECAST_WINDOW_DAYS,
+            alpha=settings.FORECAST_SMOOTHING_ALPHA,
+        )
+        reorder_points(
+            demand,
+            units.std(axis=1),
+            lead_time_days=settings.FORECAST_LEAD_TIME_DAYS,
+            service_level=settings.FORECAST_SERVICE_LEVEL,
+        )
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stores", type=int, default=50)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument(
+        "--method",
+        choices=["moving_average", "exponential_smoothing"],
+        default="exponential_smoothing",
+    )
+    parser.add_argument("--database", action="store_true")
+    args = parser.parse_args()
+
+    series = args.stores * args.items
+    elapsed = compute(series, args.density, args.method)
+    print(
+        f"in memory: {series} series in {elapsed:.2f} s, "
+        f"{series / elapsed:,.0f} series/s"
+    )
+    if not args.database:
+        return
+
+    today = datetime.now(timezone.utc).date()
+    params = {
+        "stores": args.stores,
+        "items": args.items,
+        "density": args.density,
+        "start": today - timedelta(days=settings.FORECAST_HISTORY_DAYS),
+        "end": today - timedelta(days=1),
+    }
+    with Session(engine) as session:
+        try:
+            started = time.perf_counter()
+            for statement in SEED:
+                session.execute(text(statement), params)
+            session.commit()
+            print(f"seeded in {time.perf_counter() - started:.1f} s")
+
+            run = recompute(session, method=args.method, today=today)
+            print(
+                f"{args.stores} stores x {args.items} items: {run.count} series "
+                f"in {run.elapsed_seconds:.2f} s, {run.series_per_second:,.0f} series/s"
+            )
+        finally:
+            session.rollback()
+            for statement in CLEANUP:
+                session.execute(text(statement))
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
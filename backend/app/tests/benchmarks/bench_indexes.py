@@ -0,0 +1,126 @@
+"""
+Plan and latency of the inventory lookups with and without their indexes.
+
+Seeds scratch copies of warehouseitemsbyid, storeitemsbyid and purchase as
+temporary tables (nothing is written to the real tables), runs the hot
+queries, adds the indexes from migration d7a3c5e91b04 and runs them again.
+
+    python -m app.tests.benchmarks.bench_indexes --rows 1000000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import Connection, text
+
+from app.core.db import engine
+
+TABLES = ["warehouseitemsbyid", "storeitemsbyid", "purchase"]
+
+INDEXES = [
+    "CREATE INDEX ON bench_warehouseitemsbyid (warehouse_id, id)",
+    "CREATE UNIQUE INDEX ON bench_warehouseitemsbyid (warehouse_id, item_id)",
+    "CREATE INDEX ON bench_warehouseitemsbyid (item_id)",
+    "CREATE INDEX ON bench_storeitemsbyid (store_id, id)",
+    "CREATE UNIQUE INDEX ON bench_storeitemsbyid (store_id, item_id)",
+    "CREATE INDEX ON bench_storeitemsbyid (item_id)",
+    "CREATE INDEX ON bench_purchase (store_id, date)",
+    "CREATE INDEX ON bench_purchase (item_id)",
+    "CREATE INDEX ON bench_purchase (date)",
+]
+
+QUERIES = {
+    "read_warehouse_items_by_id": (
+        "SELECT * FROM bench_warehouseitemsbyid WHERE warehouse_id = :location "
+        "ORDER BY id LIMIT 100"
+    ),
+    "read_store_items_by_id (keyset)": (
+        "SELECT * FROM bench_storeitemsbyid WHERE store_id = :location "
+        "AND id > :after ORDER BY id LIMIT 100"
+    ),
+    "store upsert lookup": (
+        "SELECT * FROM bench_storeitemsbyid "
+        "WHERE store_id = :location AND item_id = :item"
+    ),
+    "purchases of a store by date": (
+        "SELECT * FROM bench_purchase WHERE store_id = :location "
+        "ORDER BY date DESC LIMIT 100"
+    ),
+}
+
+
+def seed(connection: Connection, rows: int, locations: int) -> None:
+    for table in TABLES:
+        connection.execute(
+            text(
+                f"CREATE TEMP TABLE bench_{table} "
+                f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+        )
+    # Each location holds a distinct range of items so (location, item) is unique
+    for table, location in [
+        ("warehouseitemsbyid", "warehouse_id"),
+        ("storeitemsbyid", "store_id"),
+    ]:
+        connection.execute(
+            text(
+                f"INSERT INTO bench_{table} "
+                f"(id, {location}, item_id, item_name, warehouse_price, "
+                "retail_price, quantity) "
+                "SELECT n, n % :locations, n, 'item ' || n, 1.0, 1.5, n % 50 "
+                "FROM generate_series(1, :rows) AS n"
+            ),
+            {"rows": rows, "locations": locations},
+        )
+    connection.execute(
+        text(
+            "INSERT INTO bench_purchase "
+            "(id, store_id, item_id, item_name, warehouse_price, retail_price, "
+            "quantity, date) "
+            "SELECT n, n % :locations, n % 10000, 'item ' || n, 1.0, 1.5, 1, "
+            "timestamptz '2020-01-01 00:00:00+00' + n * interval '1 minute' "
+            "FROM generate_series(1, :rows) AS n"
+        ),
+        {"rows": rows, "locations": locations},
+    )
+    for table in TABLES:
+        connection.execute(text(f"ANALYZE bench_{table}"))
+
+
+def run_queries(connection: Connection, params: dict[str, int], repeat: int) -> None:
+    for name, query in QUERIES.items():
+        plan = connection.execute(text(f"EXPLAIN {query}"), params).scalars().all()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            connection.execute(text(query), params).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"  {name}: median {statistics.median(timings):.2f} ms")
+        for line in plan[:3]:
+            print(f"      {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--locations", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    location = args.locations // 2
+    params = {"location": location, "after": args.rows // 2, "item": location}
+    with engine.connect() as connection, connection.begin():
+        print(f"Seeding {args.rows} rows per table...")
+        seed(connection, args.rows, args.locations)
+        print("Without indexes:")
+        run_queries(connection, params, args.repeat)
+        for statement in INDEXES:
+            connection.execute(text(statement))
+        for table in TABLES:
+            connection.execute(text(f"ANALYZE bench_{table}"))
+        print("With indexes:")
+        run_queries(connection, params, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Latency of item name autocomplete served from the in-memory prefix index,
+over a synthetic catalog, with a share of lookups following item writes:
+
+    python -m app.tests.benchmarks.bench_item_search --items 1000000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from app.core.prefix_index import PrefixIndex
+
+_words_rng = random.Random(1)
+WORDS = [
+    "".join(_words_rng.choices(string.ascii_lowercase, k=_words_rng.randint(3, 9)))
+    for _ in range(5000)
+]
+
+
+def name(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    # Share of lookups preceded by the rename of an item
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.load((id, name(rng)) for id in range(1, args.items + 1))
+    print(f"loaded {len(index)} names in {time.perf_counter() - started:.1f} s")
+
+    latencies = []
+    for _ in range(args.lookups):
+        prefix = rng.choice(WORDS)[: rng.randint(1, 4)]
+        started = time.perf_counter()
+        if rng.random() < args.write_ratio:
+            # As autocomplete_items does after an invalidation
+            id = rng.randint(1, args.items)
+            index.invalidate(id)
+            index.update(index.take_pending(), [(id, name(rng))])
+        index.search(prefix, args.limit)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"p50 {p50:6.3f} ms  p99 {p99:6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
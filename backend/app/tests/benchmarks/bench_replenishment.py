@@ -0,0 +1,64 @@
+"""
+Time of replenishment planning on synthetic networks of increasing size.
+
+For each size, about --deficit-share of the store items need a refill and
+each warehouse holds about half of the items. Times the allocation and
+the grouping into transfers separately:
+
+    python -m app.tests.benchmarks.bench_replenishment --deficit-share 0.3
+"""
+import argparse
+import time
+from typing import Any
+
+import numpy as np
+
+from app.replenishment import allocate, transfers
+
+# (warehouses, stores, items)
+SIZES = [(5, 50, 1_000), (10, 200, 5_000), (20, 500, 10_000), (50, 1_000, 20_000)]
+
+
+def network(
+    warehouses: int, stores: int, items: int, deficit_share: float
+) -> tuple[Any, ...]:
+    rng = np.random.default_rng(0)
+    # Demands by item, then store, as the planner's query sorts them
+    needed = np.flatnonzero(rng.random(stores * items) < deficit_share)
+    demand_items, demand_stores = np.divmod(needed, stores)
+    demand_units = rng.integers(1, 20, len(needed))
+    held = np.flatnonzero(rng.random(warehouses * items) < 0.5)
+    supply_items, supply_warehouses = np.divmod(held, warehouses)
+    supply_units = rng.integers(1, 20 * stores, len(held))
+    return (
+        demand_items,
+        demand_stores,
+        demand_units,
+        supply_items,
+        supply_warehouses,
+        supply_units,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deficit-share", type=float, default=0.3)
+    args = parser.parse_args()
+
+    for warehouses, stores, items in SIZES:
+        arrays = network(warehouses, stores, items, args.deficit_share)
+        started = time.perf_counter()
+        allocation = allocate(*arrays)
+        allocated = time.perf_counter()
+        planned = transfers(allocation)
+        grouped = time.perf_counter()
+        print(
+            f"{warehouses} warehouses, {stores} stores, {items} items: "
+            f"{len(arrays[0])} deficits -> {len(allocation.quantities)} lines in "
+            f"{len(planned)} transfers, allocated in {allocated - started:.2f} s, "
+            f"grouped in {grouped - allocated:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
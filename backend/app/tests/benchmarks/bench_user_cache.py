@@ -0,0 +1,55 @@
+"""
+SQL statements and latency per authenticated request with and without the
+user cache, measured in-process on /users/me:
+
+    python -m app.tests.benchmarks.bench_user_cache --requests 2000
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from app.api.deps import user_cache
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+from app.tests.utils.utils import get_superuser_token_headers, record_statements
+
+
+def run(
+    client: TestClient, headers: dict[str, str], requests: int, cached: bool
+) -> None:
+    latencies = []
+    with record_statements(engine) as statements:
+        for _ in range(requests):
+            if not cached:
+                user_cache.clear()
+            started = time.perf_counter()
+            response = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"  {len(statements) / requests:5.2f} statements/request  "
+        f"p50 {p50:6.2f} ms  p99 {p99:6.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        headers = get_superuser_token_headers(client)
+        for cached in (False, True):
+            print("cached:" if cached else "uncached:")
+            run(client, headers, args.requests, cached)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+from app.models import (
+    StoreItemsById,
+    StoreItemsByIdCreate,
+    WarehouseItemsById,
+    WarehouseItemsByIdCreate,
+)
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+from app.tests.utils.warehouse import create_random_warehouse
+
+
+def test_upsert_warehouse_stock_creates_then_increments(db: Session) -> None:
+    warehouse = create_random_warehouse(db)
+    item = create_random_item(db)
+    assert warehouse.id and item.id
+    row_in = WarehouseItemsByIdCreate(
+        warehouse_id=warehouse.id,
+        item_id=item.id,
+        item_name=item.name,
+        warehouse_price=item.warehouse_price,
+        retail_price=item.retail_price,
+        quantity=5,
+    )
+    [created] = crud.upsert_stock(
+        session=db, model=WarehouseItemsById, rows_in=[row_in]
+    )
+    [updated] = crud.upsert_stock(
+        session=db, model=WarehouseItemsById, rows_in=[row_in]
+    )
+    assert updated.id == created.id
+    assert created.quantity == 5
+    assert updated.quantity == 10
+
+
+def test_upsert_store_stock_concurrent_writers(db: Session) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    assert store.id and item.id
+    row_in = StoreItemsByIdCreate(
+        store_id=store.id,
+        item_id=item.id,
+        item_name=item.name,
+        warehouse_price=item.warehouse_price,
+        retail_price=item.retail_price,
+        quantity=1,
+    )
+    writers = 32
+    increments_per_writer = 10
+
+    def restock() -> None:
+        for _ in range(increments_per_writer):
+            with Session(engine) as session:
+                crud.upsert_stock(
+                    session=session, model=StoreItemsById, rows_in=[row_in]
+                )
+
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        for future in [executor.submit(restock) for _ in range(writers)]:
+            future.result()
+
+    [final] = crud.upsert_stock(
+        session=db,
+        model=StoreItemsById,
+        rows_in=[row_in.model_copy(update={"quantity": 0})],
+    )
+    assert final.quantity == writers * increments_per_writer
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import Forecast, SalesDaily, StoreItemsById, StoreItemsByIdCreate
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+
+np = pytest.importorskip("numpy")
+
+from app.forecasting import forecast_demand, recompute, reorder_points  # noqa: E402
+
+
+def test_forecast_demand() -> None:
+    units = np.array([[4.0, 0.0, 2.0, 6.0], [1.0, 1.0, 1.0, 1.0]])
+    average = forecast_demand(units, "moving_average", window=2, alpha=0.5)
+    assert average.tolist() == [4.0, 1.0]
+    # Levels 4, 2, 2, 4
+    smoothed = forecast_demand(units, "exponential_smoothing", window=2, alpha=0.5)
+    assert smoothed.tolist() == [4.0, 1.0]
+    points = reorder_points(
+        np.array([2.0]), np.array([0.0]), lead_time_days=7, service_level=0.95
+    )
+    assert points.tolist() == [14.0]
+
+
+def test_recompute(db: Session) -> None:
+    store = create_random_store(db)
+    sold, unsold = create_random_item(db), create_random_item(db)
+    crud.upsert_stock(
+        session=db,
+        model=StoreItemsById,
+        rows_in=[
+            StoreItemsByIdCreate(
+                store_id=store.id,
+                item_id=item.id,
+                item_name=item.name,
+                warehouse_price=1.0,
+                retail_price=2.0,
+                quantity=3,
+            )
+            for item in (sold, unsold)
+        ],
+    )
+    # Three units a day over the whole history, and one before it
+    db.add_all(
+        SalesDaily(
+            store_id=store.id,
+            item_id=sold.id,
+            day=date.fromordinal(date(2024, 6, 1).toordinal() - offset),
+            units=3,
+            revenue=6.0,
+            cost=3.0,
+        )
+        for offset in range(1, 58)
+    )
+    db.commit()
+
+    run = recompute(db, method="moving_average", today=date(2024, 6, 1))
+    assert run.count >= 2
+    assert sold.id is not None and unsold.id is not None
+
+    forecasts = {
+        forecast.item_id: forecast
+        for forecast in db.exec(select(Forecast).where(Forecast.store_id == store.id))
+    }
+    assert forecasts[sold.id].daily_demand == 3.0
+    assert forecasts[sold.id].demand_stddev == 0.0
+    assert forecasts[sold.id].reorder_point == 21.0
+    assert forecasts[unsold.id].daily_demand == 0.0
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.models import Purchase
+from app.partitions import maintain, month_start
+from app.tests.utils.item import create_random_item
+from app.tests.utils.store import create_random_store
+
+
+def test_month_start() -> None:
+    value = datetime(2024, 12, 31, 23, 59, tzinfo=timezone.utc)
+    assert month_start(value) == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert month_start(value, 1) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert month_start(value, -12) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+
+
+def test_maintain_moves_default_rows_to_their_partition(db: Session) -> None:
+    store = create_random_store(db)
+    item = create_random_item(db)
+    purchase = Purchase(
+        store_id=store.id,
+        item_id=item.id,
+        item_name=item.name,
+        warehouse_price=item.warehouse_price,
+        retail_price=item.retail_price,
+        quantity=1,
+        date=datetime(2099, 3, 15, tzinfo=timezone.utc),
+    )
+    db.add(purchase)
+    db.commit()
+
+    with engine.connect() as connection:
+        maintain(connection, ahead=1, retention_months=0, drop=False)
+        with connection.begin():
+            partition = connection.execute(
+                text("SELECT tableoid::regclass::text FROM purchase WHERE id = :id"),
+                {"id": purchase.id},
+            ).scalar()
+    assert partition == "purchase_p2099_03"
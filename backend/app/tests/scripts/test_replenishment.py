@@ -0,0 +1,24 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.replenishment import allocate, transfers  # noqa: E402
+
+
+def test_allocate() -> None:
+    # Item 1: 9 units wanted, 8 available. Item 2: nothing available.
+    # Item 3: 2 wanted, 10 available. Item 4: stocked but not wanted.
+    allocation = allocate(
+        np.array([1, 1, 2, 3]),
+        np.array([10, 11, 10, 12]),
+        np.array([5, 4, 3, 2]),
+        np.array([1, 1, 3, 4]),
+        np.array([1, 2, 2, 1]),
+        np.array([6, 2, 10, 7]),
+    )
+    assert allocation.unmet == 4
+    assert [
+        (transfer["warehouse_id"], transfer["store_id"], *line.values())
+        for transfer in transfers(allocation)
+        for line in transfer["lines"]
+    ] == [(1, 10, 1, 5), (1, 11, 1, 1), (2, 11, 1, 2), (2, 12, 3, 2)]
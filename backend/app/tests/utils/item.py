@@ -1,16 +1,20 @@
+import random
+
 from sqlmodel import Session
 
-from app import crud
 from app.models import Item, ItemCreate
-from app.tests.utils.user import create_random_user
 from app.tests.utils.utils import random_lower_string
 
 
 def create_random_item(db: Session) -> Item:
-    user = create_random_user(db)
-    owner_id = user.id
-    assert owner_id is not None
-    title = random_lower_string()
-    description = random_lower_string()
-    item_in = ItemCreate(title=title, description=description)
-    return crud.create_item(session=db, item_in=item_in, owner_id=owner_id)
+    name = random_lower_string()
+    warehouse_price = round(random.uniform(1, 100), 2)
+    retail_price = round(warehouse_price * 1.5, 2)
+    item_in = ItemCreate(
+        name=name, warehouse_price=warehouse_price, retail_price=retail_price
+    )
+    item = Item.model_validate(item_in)
+    db.add(item)
+    db.commit()
+    db.refresh(item)
+    return item
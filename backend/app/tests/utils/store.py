@@ -0,0 +1,13 @@
+from sqlmodel import Session
+
+from app.models import Store, StoreCreate
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_store(db: Session) -> Store:
+    store_in = StoreCreate(name=random_lower_string(), location=random_lower_string())
+    store = Store.model_validate(store_in)
+    db.add(store)
+    db.commit()
+    db.refresh(store)
+    return store
@@ -0,0 +1,15 @@
+from sqlmodel import Session
+
+from app.models import Warehouse, WarehouseCreate
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_warehouse(db: Session) -> Warehouse:
+    warehouse_in = WarehouseCreate(
+        name=random_lower_string(), location=random_lower_string()
+    )
+    warehouse = Warehouse.model_validate(warehouse_in)
+    db.add(warehouse)
+    db.commit()
+    db.refresh(warehouse)
+    return warehouse
@@ -0,0 +1,159 @@
+"""
+Value of the stock on hand per warehouse and store.
+
+Each location is summed in the database with a grouped aggregate and
+cached until its stock changes: the code paths writing stock rows call
+`invalidate_valuation` once committed, so a request only recomputes the
+locations written since it was last served. Every invalidation also bumps
+the generation of its location, and a valuation is only cached when no
+invalidation came in while it was computed, as it may predate the write.
+"""
+import threading
+from collections.abc import Iterable
+from typing import Any, Literal
+
+from sqlmodel import Session, SQLModel, col, func, select
+
+from app.core import invalidation
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import (
+    LocationValuation,
+    Store,
+    StoreItemsById,
+    Warehouse,
+    WarehouseItemsById,
+)
+
+LocationType = Literal["warehouse", "store"]
+
+# Location table, stock table and the stock column naming the location
+LOCATIONS: dict[str, tuple[type[SQLModel], type[SQLModel], str]] = {
+    "warehouse": (Warehouse, WarehouseItemsById, "warehouse_id"),
+    "store": (Store, StoreItemsById, "store_id"),
+}
+
+# Location type of each stock table
+STOCK_LOCATION_TYPES: dict[str, LocationType] = {
+    "warehouseitemsbyid": "warehouse",
+    "storeitemsbyid": "store",
+}
+
+valuation_cache: TTLCache[tuple[str, int], LocationValuation] = TTLCache(
+    maxsize=settings.VALUATION_CACHE_MAX_ENTRIES,
+    ttl=settings.VALUATION_CACHE_TTL_SECONDS,
+)
+
+
+# Invalidations seen per location, and in total for resets
+_generations: dict[tuple[str, int], int] = {}
+_epoch = 0
+_generations_lock = threading.Lock()
+
+
+def _generation(key: tuple[str, int]) -> tuple[int, int]:
+    with _generations_lock:
+        return _epoch, _generations.get(key, 0)
+
+
+def _cache_if_current(
+    key: tuple[str, int], generation: tuple[int, int], valuation: LocationValuation
+) -> None:
+    # Checked and set together, so no invalidation can slip in between
+    with _generations_lock:
+        if (_epoch, _generations.get(key, 0)) == generation:
+            valuation_cache.set(key, valuation)
+
+
+def _invalidate(key: str) -> None:
+    location_type, _, location_id = key.partition(":")
+    location = (location_type, int(location_id))
+    with _generations_lock:
+        _generations[location] = _generations.get(location, 0) + 1
+        valuation_cache.pop(location)
+
+
+def _reset() -> None:
+    global _epoch
+    with _generations_lock:
+        _epoch += 1
+        valuation_cache.clear()
+
+
+invalidation.register("valuation", invalidate=_invalidate, reset=_reset)
+
+
+def invalidate_valuation(
+    session: Session, location_type: str, location_ids: Iterable[int]
+) -> None:
+    """
+    Drop the valuations of `location_ids` from the cache of every worker,
+    once their stock change is committed.
+    """
+    invalidation.publish_many(
+        session,
+        "valuation",
+        (f"{location_type}:{location_id}" for location_id in sorted(set(location_ids))),
+    )
+
+
+def _compute(
+    session: Session, location_type: str, location_ids: list[int], every: bool
+) -> dict[int, LocationValuation]:
+    _, stock_model, location_column_name = LOCATIONS[location_type]
+    location_column: Any = col(getattr(stock_model, location_column_name))
+    quantity: Any = col(stock_model.quantity)  # type: ignore[attr-defined]
+    statement = select(
+        location_column,
+        func.sum(quantity),
+        func.sum(quantity * col(stock_model.warehouse_price)),  # type: ignore[attr-defined]
+        func.sum(quantity * col(stock_model.retail_price)),  # type: ignore[attr-defined]
+    ).group_by(location_column)
+    if not every:
+        statement = statement.where(location_column.in_(location_ids))
+    sums = {row[0]: row for row in session.exec(statement)}
+
+    computed = {}
+    for location_id in location_ids:
+        _, units, warehouse_value, retail_value = sums.get(
+            location_id, (location_id, 0, 0.0, 0.0)
+        )
+        computed[location_id] = LocationValuation(
+            location_type=location_type,
+            location_id=location_id,
+            units=units,
+            warehouse_value=warehouse_value,
+            retail_value=retail_value,
+        )
+    return computed
+
+
+def valuate(
+    session: Session, location_type: str, location_id: int | None = None
+) -> list[LocationValuation]:
+    """
+    Valuations of every location of `location_type`, or of `location_id`
+    only, in id order.
+
+    Locations missing from the cache are computed together in one grouped
+    query, over the whole stock table when none of them is cached.
+    """
+    location_model = LOCATIONS[location_type][0]
+    location_key: Any = col(location_model.id)  # type: ignore[attr-defined]
+    statement = select(location_key).order_by(location_key)
+    if location_id is not None:
+        statement = statement.where(location_key == location_id)
+    location_ids = list(session.exec(statement))
+
+    valuations = {
+        key: valuation_cache.get((location_type, key)) for key in location_ids
+    }
+    missing = [key for key, valuation in valuations.items() if valuation is None]
+    if missing:
+        # Taken before computing, see the module docstring
+        generations = {key: _generation((location_type, key)) for key in missing}
+        every = location_id is None and len(missing) == len(location_ids)
+        for key, valuation in _compute(session, location_type, missing, every).items():
+            _cache_if_current((location_type, key), generations[key], valuation)
+            valuations[key] = valuation
+    return [valuation for valuation in valuations.values() if valuation is not None]